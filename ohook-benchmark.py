@@ -0,0 +1,340 @@
+import os
+import sys
+import io
+import re
+import json
+import time
+import random
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import contextlib
+import http.server
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmark offline dos trechos de E/S do ohook-builder.py: download, extração,
+# hash, cópia da árvore de código e cópia para a saída. Tudo roda localmente,
+# com arquivos sintéticos servidos por um servidor HTTP próprio.
+
+BUILDER_PATH = Path(__file__).resolve().parent / "ohook-builder.py"
+
+DEFAULT_SIZES_MB = [16, 64]
+DEFAULT_FILE_COUNTS = [64, 1024]
+DEFAULT_BUFFER_SIZES = [8 * 1024, 64 * 1024, 1024 * 1024]
+DEFAULT_CONCURRENCY = [1, 2, 4]
+DEFAULT_REPEAT = 3
+
+def load_builder():
+    spec = importlib.util.spec_from_file_location("ohook_builder", BUILDER_PATH)
+    builder = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(builder)
+    return builder
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # Servidor local com suporte a "Range", necessário para retomada e segmentos;
+    # "delay" e "rate" simulam mirrors lentos (latência e vazão)
+    delay = 0.0
+    rate = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = Path(self.translate_path(self.path))
+        if not path.is_file():
+            self.send_error(404)
+            return
+
+        time.sleep(self.delay)
+        stat = path.stat()
+        size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+        start, end = 0, size - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        # If-Range com outra versão: o Range é ignorado e o arquivo vai inteiro
+        if match and self.headers.get("If-Range", etag) == etag:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.end_headers()
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            chunk_size = 64 * 1024 if self.rate else 1024 * 1024
+            while remaining > 0:
+                buffer = f.read(min(chunk_size, remaining))
+                if not buffer:
+                    break
+                self.wfile.write(buffer)
+                remaining -= len(buffer)
+                if self.rate:
+                    time.sleep(len(buffer) / self.rate)
+
+@contextlib.contextmanager
+def local_server(directory, delay=0.0, rate=None):
+    handler_class = type("ThrottledHandler", (RangeRequestHandler,), {"delay": delay, "rate": rate})
+    handler = lambda *args, **kwargs: handler_class(*args, directory=str(directory), **kwargs)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def generate_archive(path, size_bytes, file_count, seed=0):
+    # Conteúdo pseudoaleatório (incompressível) e reprodutível pela semente
+    rng = random.Random(seed)
+    per_file = max(1, size_bytes // file_count)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for index in range(file_count):
+            archive.writestr(f"bench/dir{index % 16:02d}/file{index:05d}.bin", rng.randbytes(per_file))
+    return path
+
+def measure(function, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - started
+        if result is False or result is None:
+            raise RuntimeError(f"{getattr(function, '__name__', 'etapa')} falhou durante o benchmark")
+        timings.append(elapsed)
+    return timings
+
+def record(results, stage, params, size_bytes, timings):
+    median = statistics.median(timings)
+    entry = {
+        "stage": stage,
+        "params": params,
+        "bytes": size_bytes,
+        "seconds": [round(value, 6) for value in timings],
+        "min": round(min(timings), 6),
+        "median": round(median, 6),
+        "max": round(max(timings), 6),
+        "throughput_mb_s": round(size_bytes / median / 1024 ** 2, 2) if median > 0 else None
+    }
+    results.append(entry)
+    print(f"{stage:<14} {json.dumps(params, sort_keys=True):<46} {entry['median']:>9.4f}s {entry['throughput_mb_s'] or 0:>9.1f} MB/s")
+
+def remove_path(path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+def run_benchmarks(builder, work_dir, sizes_mb, file_counts, buffer_sizes, concurrency, repeat):
+    results = []
+    serve_dir = work_dir / "serve"
+    serve_dir.mkdir(parents=True, exist_ok=True)
+    builder.TEMP_DIR = work_dir / "temp"
+    builder.RETRY_BASE_DELAY = 0.01
+    seven_zip_path = builder.locate_7zip() if hasattr(builder, "locate_7zip") else None
+
+    with local_server(serve_dir) as base_url:
+        for size_mb in sizes_mb:
+            for file_count in file_counts:
+                archive = generate_archive(serve_dir / f"bench-{size_mb}mb-{file_count}.zip", size_mb * 1024 ** 2, file_count)
+                size_bytes = archive.stat().st_size
+                url = f"{base_url}/{archive.name}"
+                download_target = work_dir / "download" / archive.name
+                download_target.parent.mkdir(parents=True, exist_ok=True)
+                base = {"size_mb": size_mb, "files": file_count}
+
+                # download_file: tamanho do buffer x número de segmentos
+                builder.SEGMENT_MIN_SIZE = 1
+                for buffer_size in buffer_sizes:
+                    for segments in concurrency:
+                        timings = measure(
+                            lambda: builder.download_file(url, download_target, segments=segments, buffer_size=buffer_size),
+                            repeat, setup=lambda: remove_path(download_target)
+                        )
+                        record(results, "download", dict(base, buffer=buffer_size, segments=segments), size_bytes, timings)
+
+                # Downloads simultâneos de cópias do mesmo arquivo
+                for workers in concurrency:
+                    targets = [work_dir / "download" / f"{index}-{archive.name}" for index in range(workers)]
+
+                    def download_all():
+                        with ThreadPoolExecutor(max_workers=workers) as executor:
+                            return all(executor.map(lambda target: builder.download_file(url, target), targets))
+
+                    timings = measure(download_all, repeat, setup=lambda: [remove_path(target) for target in targets])
+                    record(results, "download-pool", dict(base, workers=workers), size_bytes * workers, timings)
+
+                # calculate_sha256: leitura em blocos e mmap
+                for buffer_size in buffer_sizes:
+                    timings = measure(lambda: builder.calculate_sha256(archive, buffer_size=buffer_size, use_mmap=False), repeat)
+                    record(results, "sha256", dict(base, buffer=buffer_size, mmap=False), size_bytes, timings)
+                timings = measure(lambda: builder.calculate_sha256(archive, use_mmap=True), repeat)
+                record(results, "sha256", dict(base, mmap=True), size_bytes, timings)
+
+                # extract_archive: .zip em processo e, se houver 7-Zip, o executável
+                extract_dir = work_dir / "extract"
+                timings = measure(lambda: builder.extract_archive(archive, extract_dir, seven_zip_path),
+                                  repeat, setup=lambda: remove_path(extract_dir))
+                record(results, "extract-zip", base, size_bytes, timings)
+
+                if seven_zip_path:
+                    timings = measure(lambda: builder.extract_with_7zip(archive, extract_dir, seven_zip_path) or True,
+                                      repeat, setup=lambda: remove_path(extract_dir))
+                    record(results, "extract-7z", base, size_bytes, timings)
+
+                # Índice de integridade: criação (hash de tudo) e verificação sem mudanças (só stat)
+                timings = measure(lambda: builder.build_integrity_index(extract_dir), repeat)
+                record(results, "index-build", base, size_bytes, timings)
+                timings = measure(lambda: builder.verify_toolchain_integrity(extract_dir) == [], repeat)
+                record(results, "index-check", base, size_bytes, timings)
+                (extract_dir / builder.INTEGRITY_INDEX_FILE).unlink()
+
+                # shutil.copytree da árvore extraída, como na etapa "source"
+                copy_dir = work_dir / "copytree"
+                timings = measure(lambda: shutil.copytree(extract_dir, copy_dir), repeat, setup=lambda: remove_path(copy_dir))
+                record(results, "copytree", base, size_bytes, timings)
+
+                # stage_tree nos dois modos; a origem é recriada antes de cada medida
+                # porque no modo "link" ela é movida para o destino
+                stage_source = work_dir / "stage-source"
+                stage_dir = work_dir / "stage"
+                for mode in builder.STAGING_MODES:
+                    timings = measure(lambda: builder.stage_tree(stage_source, stage_dir, mode), repeat,
+                                      setup=lambda: remove_path(stage_source) or shutil.copytree(extract_dir, stage_source))
+                    record(results, "stage-tree", dict(base, mode=mode), size_bytes, timings)
+                remove_path(stage_source)
+                remove_path(stage_dir)
+
+                remove_path(download_target)
+                remove_path(archive)
+
+    run_mirror_benchmark(builder, work_dir, sizes_mb[0], repeat, results)
+
+    # copy_to_output_dir com DLLs sintéticas do tamanho das reais
+    compile_dir = work_dir / "compile"
+    compile_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(1)
+    for dll_file in builder.EXPECTED_CHECKSUMS:
+        (compile_dir / dll_file).write_bytes(rng.randbytes(64 * 1024))
+    builder.OHOOK_COMPILE_DIR = compile_dir
+    builder.OUTPUT_DIR = work_dir / "output"
+    size_bytes = builder.path_size(compile_dir.iterdir())
+    for mode in builder.STAGING_MODES:
+        timings = measure(lambda: builder.copy_to_output_dir(mode), max(repeat, 10), setup=lambda: remove_path(builder.OUTPUT_DIR))
+        record(results, "copy-output", {"files": len(builder.EXPECTED_CHECKSUMS), "mode": mode}, size_bytes, timings)
+
+    return results
+
+def run_mirror_benchmark(builder, work_dir, size_mb, repeat, results):
+    # Vários servidores locais fazendo papel de mirrors: um com latência alta,
+    # um com vazão limitada, um com conteúdo corrompido, um inexistente e um
+    # rápido. A seleção deve ficar com o rápido e conferir o SHA-256
+    good_dir = work_dir / "mirror-good"
+    corrupt_dir = work_dir / "mirror-corrupt"
+    good_dir.mkdir(parents=True, exist_ok=True)
+    corrupt_dir.mkdir(parents=True, exist_ok=True)
+    archive = generate_archive(good_dir / "mirror.zip", size_mb * 1024 ** 2, 16)
+    generate_archive(corrupt_dir / "mirror.zip", size_mb * 1024 ** 2, 16, seed=1)
+    expected = builder.hash_file(archive)
+    target = work_dir / "download" / "mirror.zip"
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    with contextlib.ExitStack() as servers:
+        slow_latency = servers.enter_context(local_server(good_dir, delay=0.5))
+        slow_rate = servers.enter_context(local_server(good_dir, rate=4 * 1024 ** 2))
+        corrupt = servers.enter_context(local_server(corrupt_dir))
+        fast = servers.enter_context(local_server(good_dir))
+        resource = {
+            "url": f"{slow_latency}/mirror.zip",
+            "sha256": expected,
+            "mirrors": [f"{corrupt}/mirror.zip", f"{slow_rate}/mirror.zip", str(work_dir / "missing.zip"), f"{fast}/mirror.zip"]
+        }
+
+        sources = []
+        def download():
+            digest, source = builder.download_from_sources(resource, target, expected)
+            sources.append(source)
+            return digest == expected
+
+        timings = measure(download, repeat, setup=lambda: remove_path(target))
+        record(results, "mirrors", {"size_mb": size_mb, "mirrors": len(resource["mirrors"]) + 1}, archive.stat().st_size, timings)
+        print(f"{'':<14} fonte escolhida: {'rápida' if set(sources) == {resource['mirrors'][-1]} else sources}")
+
+    remove_path(target)
+
+def compare_results(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    previous = {(entry["stage"], json.dumps(entry["params"], sort_keys=True)): entry for entry in baseline["results"]}
+    print(f"\nComparação com {baseline_path} (mediana atual / anterior):")
+    for entry in current:
+        key = (entry["stage"], json.dumps(entry["params"], sort_keys=True))
+        if key in previous and previous[key]["median"] > 0:
+            ratio = entry["median"] / previous[key]["median"]
+            print(f"{entry['stage']:<14} {key[1]:<46} {ratio:>6.2f}x")
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline das etapas de E/S do ohook-builder")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES_MB, help="tamanhos dos arquivos sintéticos (MB)")
+    parser.add_argument("--files", type=int, nargs="+", default=DEFAULT_FILE_COUNTS, help="quantidade de arquivos por pacote")
+    parser.add_argument("--buffer-sizes", type=int, nargs="+", default=DEFAULT_BUFFER_SIZES, help="tamanhos de buffer (bytes)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY, help="níveis de concorrência")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="repetições por medida")
+    parser.add_argument("--work-dir", help="diretório de trabalho (padrão: temporário)")
+    parser.add_argument("--output", default="benchmark-results.json", help="arquivo JSON com os resultados")
+    parser.add_argument("--compare", metavar="JSON", help="resultado anterior para comparação")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    builder = load_builder()
+
+    with tempfile.TemporaryDirectory(prefix="ohook-bench-") as temp_dir:
+        work_dir = Path(args.work_dir or temp_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+        print(f"{'Etapa':<14} {'Parâmetros':<46} {'Mediana':>10} {'Vazão':>14}")
+        results = run_benchmarks(builder, work_dir, args.sizes, args.files, args.buffer_sizes, args.concurrency, args.repeat)
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.compare:
+        compare_results(results, args.compare)
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,30 +1,371 @@
 import os
+import re
 import sys
+import argparse
+import contextlib
 import subprocess
 import tempfile
 import shutil
 import hashlib
-import ctypes
 import zipfile
+import tarfile
 import urllib.request
+import urllib.error
 import time
-from datetime import datetime
-import winreg
+import json
+import mmap
+import random
+import struct
+import io
+import uuid
+import http.server
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 import threading
 import logging
-from pathlib import Path
+import logging.handlers
+import queue
+import atexit
+from collections import deque
+from pathlib import Path, PurePosixPath, PureWindowsPath
+
+# Toolchain cruzado do sistema usado no Linux (pacotes mingw-w64), passado ao
+# make pelas variáveis de compilador do Makefile do ohook. Antes de compilar,
+# um "make -n" confere que o Makefile realmente usa cada uma delas
+LINUX_MAKE_VARIABLES = {
+    "CC32": "i686-w64-mingw32-gcc",
+    "CC64": "x86_64-w64-mingw32-gcc"
+}
+
+FICLONE = 0x40049409
+
+class WindowsPlatform:
+    name = "windows"
+    supports_clock_mode = True
+    uses_host_toolchain = False
+    
+    def __init__(self):
+        self.main_dir = Path("C:\\OHookBuilder")
+        # Caminhos exigidos pelas instruções originais de compilação
+        self.compile_dir = Path("C:\\ohook")
+        self.toolchain_links = {"mingw32": Path("C:\\mingw32"), "mingw64": Path("C:\\mingw64")}
+    
+    def is_admin(self):
+        import ctypes
+        return ctypes.windll.shell32.IsUserAnAdmin() != 0
+    
+    def locate_7zip(self):
+        import winreg
+        for access_key in [winreg.KEY_WOW64_64KEY, winreg.KEY_WOW64_32KEY]:
+            try:
+                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\7-Zip", 0, winreg.KEY_READ | access_key)
+                path_value, _ = winreg.QueryValueEx(key, "Path")
+                winreg.CloseKey(key)
+                exe_path = Path(path_value) / "7z.exe"
+                if exe_path.exists():
+                    return str(exe_path)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logging.debug(f"Erro ao buscar 7-Zip no registro ({access_key}): {e}")
+                
+        common_paths = [
+            Path("C:\\Program Files\\7-Zip\\7z.exe"),
+            Path("C:\\Program Files (x86)\\7-Zip\\7z.exe")
+        ]
+        
+        for path in common_paths:
+            if path.exists():
+                return str(path)
+                
+        return None
+    
+    def create_link(self, link, target):
+        subprocess.run(
+            ["cmd", "/c", f"mklink /J {link} {target}"],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    
+    def remove_link(self, link):
+        subprocess.run(
+            ["cmd", "/c", f"rmdir {link}"],
+            check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    
+    def set_timezone_utc(self):
+        subprocess.run(
+            ["powershell", "-Command", "Set-TimeZone -Id 'UTC'"],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            encoding='utf-8', errors='replace'
+        )
+    
+    def clone_file(self, source, destination):
+        # Clonagem de blocos (ReFS) não é usada; o chamador recorre a hardlink/cópia
+        raise OSError("reflink não suportado no Windows")
+    
+    def lock_file(self, handle):
+        import msvcrt
+        handle.seek(0)
+        while True:
+            try:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK desiste após ~10 s; continua esperando
+                continue
+    
+    def unlock_file(self, handle):
+        import msvcrt
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    
+    def make_command(self):
+        mingw_make = self.toolchain_links["mingw64"] / "bin" / "mingw32-make.exe"
+        return [str(mingw_make)] if mingw_make.exists() else None
+    
+    def make_variables(self):
+        return []
+    
+    def toolchain_identity(self):
+        return None
+
+class LinuxPlatform:
+    name = "linux"
+    supports_clock_mode = False
+    uses_host_toolchain = True
+    
+    def __init__(self):
+        self.main_dir = Path(os.environ.get("OHOOK_BUILDER_HOME", Path.home() / ".ohook-builder"))
+        # Compila direto no diretório do código-fonte, sem links em caminhos fixos
+        self.compile_dir = None
+        self.toolchain_links = {}
+    
+    def is_admin(self):
+        # Nada fora de main_dir é alterado, então não é preciso ser root
+        return True
+    
+    def locate_7zip(self):
+        for name in ["7z", "7za", "7zz"]:
+            path = shutil.which(name)
+            if path:
+                return path
+        return None
+    
+    def create_link(self, link, target):
+        os.symlink(target, link, target_is_directory=True)
+    
+    def remove_link(self, link):
+        if link.is_symlink():
+            link.unlink()
+    
+    def set_timezone_utc(self):
+        # O fuso vai para o ambiente do make (TZ=UTC), sem alterar o sistema
+        pass
+    
+    def clone_file(self, source, destination):
+        # Reflink (ioctl FICLONE) em sistemas de arquivos como Btrfs e XFS
+        import fcntl
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, destination)
+    
+    def lock_file(self, handle):
+        import fcntl
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+    
+    def unlock_file(self, handle):
+        import fcntl
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    
+    def make_command(self):
+        make = shutil.which("make")
+        return [make] if make else None
+    
+    def make_variables(self):
+        return [f"{name}={compiler}" for name, compiler in LINUX_MAKE_VARIABLES.items()]
+    
+    def toolchain_identity(self):
+        versions = []
+        for compiler in LINUX_MAKE_VARIABLES.values():
+            try:
+                result = subprocess.run(
+                    [compiler, "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    encoding='utf-8', errors='replace'
+                )
+            except (OSError, subprocess.CalledProcessError) as e:
+                logging.warning(f"Compilador {compiler} indisponível: {e}")
+                return None
+            versions.append(result.stdout)
+        return hashlib.sha256("".join(versions).encode("utf-8")).hexdigest()
+
+def get_platform():
+    # Só o backend da plataforma atual é usado; winreg e ctypes são importados
+    # dentro dos métodos do Windows
+    if sys.platform == "win32":
+        return WindowsPlatform()
+    return LinuxPlatform()
+
+PLATFORM = get_platform()
 
 # Estrutura de diretórios principal
-MAIN_DIR = Path("C:\\OHookBuilder")
+MAIN_DIR = PLATFORM.main_dir
 SOURCE_DIR = MAIN_DIR / "ohook"
 COMPILERS_DIR = MAIN_DIR / "Compiladores"
 MINGW32_DIR = COMPILERS_DIR / "mingw32"
 MINGW64_DIR = COMPILERS_DIR / "mingw64"
+# Cada versão de toolchain é extraída uma única vez em store\<nome>-<versão>;
+# MINGW32_DIR/MINGW64_DIR são links para a versão em uso
+TOOLCHAIN_STORE_DIR = COMPILERS_DIR / "store"
+TOOLCHAIN_STORE_KEEP = 2
+KEEP_TOOLCHAIN_LINKS = True
 TEMP_DIR = MAIN_DIR / "Temp"
 OUTPUT_DIR = MAIN_DIR / "Output"
 
+# Cache persistente de downloads, endereçado pelo SHA-256 do conteúdo
+CACHE_DIR = MAIN_DIR / "Cache"
+DOWNLOAD_CACHE_DIR = CACHE_DIR / "downloads"
+CACHE_INDEX_FILE = CACHE_DIR / "index.json"
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Cache de DLLs compiladas, indexado pelo código-fonte, toolchains e opções de compilação
+ARTIFACT_CACHE_DIR = CACHE_DIR / "artifacts"
+ARTIFACT_INDEX_FILE = ARTIFACT_CACHE_DIR / "index.json"
+ARTIFACT_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+# Downloads simultâneos e espera entre tentativas (backoff exponencial)
+DOWNLOAD_WORKERS = 3
+# Sondagem dos mirrors: bytes lidos de cada fonte e tempo máximo de espera
+MIRROR_PROBE_BYTES = 256 * 1024
+MIRROR_PROBE_TIMEOUT = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# Barra de progresso redesenhada no máximo a cada PROGRESS_REFRESH_INTERVAL
+# segundos; no log entram apenas os marcos de PROGRESS_LOG_STEP em PROGRESS_LOG_STEP %
+PROGRESS_REFRESH_INTERVAL = 0.25
+PROGRESS_LOG_STEP = 25
+
+# Leitura em blocos grandes e download opcional em segmentos paralelos (HTTP Range)
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+DOWNLOAD_SEGMENTS = 1
+SEGMENT_MIN_SIZE = 32 * 1024 * 1024
+
+# Cálculo de hash de arquivos locais: blocos grandes ou mmap para arquivos grandes
+HASH_BUFFER_SIZE = 1024 * 1024
+HASH_MMAP_MIN_SIZE = 64 * 1024 * 1024
+
+# Extração: arquivos extraídos em paralelo e threads de descompressão do 7-Zip
+EXTRACT_WORKERS = 3
+# Cada pacote começa a ser extraído assim que seu download é verificado,
+# enquanto os demais ainda estão sendo baixados
+OVERLAP_EXTRACTION = True
+SEVEN_ZIP_THREADS = "on"
+
+# Extração seletiva: apenas os arquivos dos toolchains usados pelo Makefile do
+# ohook (make, gcc, binutils, cabeçalhos e bibliotecas do Windows)
+SELECTIVE_EXTRACTION = True
+TOOLCHAIN_MANIFEST_FILE = ".ohook-manifest.json"
+# Índice de integridade (tamanho, mtime e SHA-256 por arquivo) gravado na
+# extração; as execuções seguintes só recalculam o hash do que mudou de stat
+INTEGRITY_INDEX_FILE = ".ohook-integrity.json"
+INTEGRITY_WORKERS = 8
+TOOLCHAINS = {
+    "mingw32": {"dir": MINGW32_DIR, "root": "mingw32", "triplet": "i686-w64-mingw32"},
+    "mingw64": {"dir": MINGW64_DIR, "root": "mingw64", "triplet": "x86_64-w64-mingw32"}
+}
+# Data de referência da compilação. No modo "clock" o relógio do sistema é
+# mantido nesta data; no modo "deterministic" ela é injetada via
+# SOURCE_DATE_EPOCH e gravada nos cabeçalhos PE após o link
+BUILD_TIMESTAMP = datetime(2023, 8, 7, 12, 0, 0, tzinfo=timezone.utc)
+TIMESTAMP_MODES = ["clock", "deterministic"]
+TIMESTAMP_MODE = "clock"
+
+# Compilação: alvos do Makefile por arquitetura, compilação paralela e logs por arquitetura
+BUILD_TARGETS = {"x86": "sppc32.dll", "x64": "sppc64.dll"}
+BUILD_PARALLEL = False
+# None: make sem -j na compilação sequencial (uma arquitetura depois da outra,
+# como o make puro); na paralela, os núcleos são divididos entre as arquiteturas
+BUILD_JOBS = None
+BUILD_LOGS_DIR = MAIN_DIR / "Logs"
+
+# Saída de make e 7-Zip: gravada no log da execução à medida que chega, com
+# rotação (a execução anterior vira .1, .2, ...) e só um trecho final em memória
+BUILD_LOG_MAX_BYTES = 10 * 1024 ** 2
+BUILD_LOG_BACKUPS = 3
+BUILD_LOG_TAIL = 50
+BUILD_DIAGNOSTICS_MAX = 200
+# Mensagens do gcc/ld/make reconhecidas no resumo de avisos e erros
+GCC_DIAGNOSTIC = re.compile(
+    r"^(?P<file>(?:[A-Za-z]:)?[^:\n]+):(?P<line>\d+):(?:(?P<column>\d+):)?\s*"
+    r"(?P<severity>fatal error|error|warning|note):\s*(?P<message>.*?)(?:\s+\[(?P<flag>-W[^\]]+)\])?$"
+)
+LINKER_DIAGNOSTIC = re.compile(r"^(?P<file>.*?):\s*(?P<message>.*undefined reference to .*|.*multiple definition of .*)$")
+MAKE_DIAGNOSTIC = re.compile(r"^(?:mingw32-)?make(?:\.exe)?(?:\[\d+\])?: \*\*\* (?P<message>.*)$")
+
+# Trace de tempos (formato do chrome://tracing), gravado junto dos logs
+TRACE_DIR = BUILD_LOGS_DIR
+
+# Carimbos das etapas do pipeline, usados para pular etapas sem alterações
+STAMPS_DIR = MAIN_DIR / "Stamps"
+
+# Pacote offline (tar): manifest.json primeiro, depois os objetos do cache e
+# os arquivos dos toolchains, na ordem em que a importação os grava
+BUNDLE_FORMAT = 1
+BUNDLE_MANIFEST = "manifest.json"
+BUNDLE_COMPRESSION = ""
+
+# Modo daemon: API HTTP local que enfileira builds. Cada worker usa o próprio
+# workspace (código-fonte, temporários, saída, carimbos e logs), que fica
+# "quente" entre jobs; caches e o store de toolchains são compartilhados
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+DAEMON_CONCURRENCY = 2
+DAEMON_OUTPUT_LINES = 2000
+DAEMON_MAX_JOBS = 200
+WORKSPACES_DIR = MAIN_DIR / "Workspaces"
+JOBS_DIR = MAIN_DIR / "Jobs"
+# Opções definidas pelo próprio daemon ao iniciar um job
+DAEMON_RESERVED_OPTIONS = ["--daemon", "--host", "--port", "--concurrency", "--workspace", "--trace", "--no-pause",
+                           "--export-bundle", "--import-bundle", "--batch", "--config", "--mirror", "--daemon-state"]
+
+# Modo lote: um manifesto com várias combinações de código-fonte, toolchains e
+# checksums esperados, executadas pelos workers do daemon. Os downloads são
+# feitos uma vez antes dos builds e o relatório consolidado fica em Batch/<data>
+BATCH_DIR = MAIN_DIR / "Batch"
+BATCH_REPORT_FILE = "report.json"
+VERIFICATION_FILE = "verification.json"
+# Toolchains conferidos por um build, repassados pelo daemon aos jobs seguintes
+VERIFIED_TOOLCHAINS_FILE = "toolchains.json"
+DAEMON_STATE_FILE = "daemon-state.json"
+
+TOOLCHAIN_PATTERNS = [
+    "{root}\\bin\\*gcc*.exe",
+    "{root}\\bin\\mingw32-make.exe",
+    "{root}\\bin\\as.exe",
+    "{root}\\bin\\ld*.exe",
+    "{root}\\bin\\strip.exe",
+    "{root}\\bin\\dlltool.exe",
+    "{root}\\bin\\windres.exe",
+    "{root}\\bin\\*.dll",
+    "{root}\\libexec\\gcc\\{triplet}\\*\\cc1.exe",
+    "{root}\\libexec\\gcc\\{triplet}\\*\\collect2.exe",
+    "{root}\\libexec\\gcc\\{triplet}\\*\\lto-wrapper.exe",
+    "{root}\\libexec\\gcc\\{triplet}\\*\\liblto_plugin*.dll",
+    "{root}\\lib\\gcc\\{triplet}",
+    "{root}\\{triplet}\\bin",
+    "{root}\\{triplet}\\include",
+    "{root}\\{triplet}\\lib"
+]
+
+# Preparação do código-fonte e publicação das DLLs: "link" renomeia, clona
+# (reflink) ou cria hardlinks quando o sistema de arquivos permite e só copia
+# quando não há alternativa; "copy" sempre copia os bytes
+STAGING_MODES = ["link", "copy"]
+STAGING_MODE = "link"
+
 # Diretório necessário para compilação conforme instruções originais
-OHOOK_COMPILE_DIR = Path("C:\\ohook")
+OHOOK_COMPILE_DIR = PLATFORM.compile_dir or SOURCE_DIR
 
 # Checksums esperados para verificação
 EXPECTED_CHECKSUMS = {
@@ -32,38 +373,131 @@ EXPECTED_CHECKSUMS = {
     "sppc64.dll": "393a1fa26deb3663854e41f2b687c188a9eacd87b23f17ea09422c4715cb5a9f"
 }
 
-# URLs para download dos recursos necessários
+# URLs para download dos recursos necessários e SHA-256 esperado de cada arquivo.
+# Com "sha256" igual a None, o hash do primeiro download é fixado no índice do
+# cache e passa a ser exigido nas execuções seguintes, mesmo depois que o
+# arquivo sair do cache. Registre aqui o SHA-256 publicado pela origem para
+# que nem o primeiro download dependa de confiança.
+# "url" é a origem oficial e identifica o recurso no cache; "mirrors" aceita
+# outras URLs HTTP(S), caches internos, file:// e caminhos locais. Todas as
+# fontes são sondadas e a mais rápida é usada, com as demais como reserva;
+# o SHA-256 é conferido qualquer que seja a fonte. Mirrors só são usados
+# quando o SHA-256 do recurso já é conhecido (fixado aqui ou no cache). "root" é o diretório que o
+# pacote do código-fonte cria ao ser extraído
 RESOURCES = {
-    "ohook": "https://github.com/asdcorp/ohook/archive/refs/tags/0.5.zip",
-    "mingw32": "https://github.com/brechtsanders/winlibs_mingw/releases/download/11.4.0-11.0.0-ucrt-r1/winlibs-i686-posix-dwarf-gcc-11.4.0-mingw-w64ucrt-11.0.0-r1.7z",
-    "mingw64": "https://github.com/brechtsanders/winlibs_mingw/releases/download/11.4.0-11.0.0-ucrt-r1/winlibs-x86_64-posix-seh-gcc-11.4.0-mingw-w64ucrt-11.0.0-r1.7z"
+    "ohook": {
+        "url": "https://github.com/asdcorp/ohook/archive/refs/tags/0.5.zip",
+        "sha256": None,
+        "mirrors": [],
+        "root": "ohook-0.5"
+    },
+    "mingw32": {
+        "url": "https://github.com/brechtsanders/winlibs_mingw/releases/download/11.4.0-11.0.0-ucrt-r1/winlibs-i686-posix-dwarf-gcc-11.4.0-mingw-w64ucrt-11.0.0-r1.7z",
+        "sha256": None,
+        "mirrors": []
+    },
+    "mingw64": {
+        "url": "https://github.com/brechtsanders/winlibs_mingw/releases/download/11.4.0-11.0.0-ucrt-r1/winlibs-x86_64-posix-seh-gcc-11.4.0-mingw-w64ucrt-11.0.0-r1.7z",
+        "sha256": None,
+        "mirrors": []
+    }
 }
 
+class ProcessLock:
+    # Exclusão entre threads e entre processos (jobs do daemon) por arquivo de trava
+    def __init__(self, path):
+        self.path = Path(path)
+        self.thread_lock = threading.Lock()
+        self.handle = None
+    
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.handle = open(self.path, "a+b")
+            PLATFORM.lock_file(self.handle)
+        except BaseException:
+            if self.handle:
+                self.handle.close()
+                self.handle = None
+            self.thread_lock.release()
+            raise
+        return self
+    
+    def __exit__(self, *exc_info):
+        try:
+            PLATFORM.unlock_file(self.handle)
+        finally:
+            self.handle.close()
+            self.handle = None
+            self.thread_lock.release()
+
 # Variáveis globais para controle da data
 keep_date_fixed = False
 date_thread = None
+log_listener = None
+clock_modified = False
+cache_lock = ProcessLock(CACHE_DIR / "cache.lock")
+# Serializa as etapas que usam os caminhos fixos (C:\\ohook, relógio do sistema)
+build_lock = ProcessLock(MAIN_DIR / "build.lock")
+trace_lock = threading.Lock()
+trace_events = []
+trace_origin = time.perf_counter()
+subprocess_count = 0
+subprocess_hook_installed = False
 log_file = MAIN_DIR / "ohook_compiler.log"
 
+def workspace_dir(name):
+    return WORKSPACES_DIR / name
+
+def use_workspace(name):
+    # Redireciona os diretórios de um build para o workspace informado
+    global SOURCE_DIR, TEMP_DIR, OUTPUT_DIR, STAMPS_DIR, BUILD_LOGS_DIR, TRACE_DIR, OHOOK_COMPILE_DIR, log_file
+    workspace = workspace_dir(name)
+    SOURCE_DIR = workspace / "ohook"
+    TEMP_DIR = workspace / "Temp"
+    OUTPUT_DIR = workspace / "Output"
+    STAMPS_DIR = workspace / "Stamps"
+    BUILD_LOGS_DIR = workspace / "Logs"
+    TRACE_DIR = BUILD_LOGS_DIR
+    OHOOK_COMPILE_DIR = PLATFORM.compile_dir or SOURCE_DIR
+    log_file = workspace / "ohook_compiler.log"
+
 def setup_logging():
-    MAIN_DIR.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        filename=str(log_file),
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    global log_listener
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    
+    file_handler = logging.FileHandler(str(log_file), encoding="utf-8")
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
     console = logging.StreamHandler()
     console.setLevel(logging.INFO)
-    logging.getLogger('').addHandler(console)
+    
+    # As threads de download e extração só enfileiram os registros; a escrita
+    # em arquivo e console acontece na thread do QueueListener
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger('')
+    root.setLevel(logging.DEBUG)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler, console, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
 
 def check_admin():
     try:
-        return ctypes.windll.shell32.IsUserAnAdmin() != 0
+        return PLATFORM.is_admin()
     except Exception as e:
         logging.error(f"Erro ao verificar privilégios de administrador: {e}")
         return False
 
-def print_status(message, status=None):
+def print_status(message, status=None, log=True):
     prefix = {
         "success": "\r[✓] ",
         "error": "\r[✗] ",
@@ -73,7 +507,10 @@ def print_status(message, status=None):
     }.get(status, "\r")
     
     end = "" if status == "progress" else None
-    print(f"{prefix}{message}", end=end)
+    print(f"{prefix}{message}", end=end, flush=status == "progress")
+    
+    if not log:
+        return
     
     log_level = {
         "success": logging.INFO,
@@ -85,8 +522,87 @@ def print_status(message, status=None):
     
     logging.log(log_level, message)
 
+def count_subprocess(event, args):
+    global subprocess_count
+    if event == "subprocess.Popen":
+        with trace_lock:
+            subprocess_count += 1
+
+def install_subprocess_counter():
+    global subprocess_hook_installed
+    # O evento de auditoria "subprocess.Popen" conta todo processo criado,
+    # inclusive os de subprocess.run e das threads auxiliares
+    if not subprocess_hook_installed:
+        sys.addaudithook(count_subprocess)
+        subprocess_hook_installed = True
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+@contextlib.contextmanager
+def timed(name, category="stage"):
+    record = {}
+    started = time.perf_counter()
+    cpu_started = cpu_seconds()
+    spawned = subprocess_count
+    try:
+        yield record
+    finally:
+        wall = time.perf_counter() - started
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((started - trace_origin) * 1e6),
+            "dur": round(wall * 1e6),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": dict(record, cpu=round(cpu_seconds() - cpu_started, 3), subprocesses=subprocess_count - spawned)
+        }
+        with trace_lock:
+            trace_events.append(event)
+
+def path_size(paths):
+    total = 0
+    for path in map(Path, paths):
+        if path.is_file():
+            total += path.stat().st_size
+        elif path.is_dir():
+            total += sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+    return total
+
+def write_trace(trace_path=None):
+    trace_path = Path(trace_path or TRACE_DIR / f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    trace_path.parent.mkdir(parents=True, exist_ok=True)
+    with trace_lock:
+        events = list(trace_events)
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    logging.info(f"Trace de tempos gravado em {trace_path}")
+    return trace_path
+
+def print_timing_summary():
+    with trace_lock:
+        events = [event for event in trace_events if event["cat"] == "stage"]
+    if not events:
+        return
+    
+    lines = [f"{'Etapa':<28} {'Tempo(s)':>9} {'CPU(s)':>8} {'MB':>9} {'MB/s':>8} {'Proc.':>6}"]
+    for event in events:
+        wall = event["dur"] / 1e6
+        megabytes = event["args"].get("bytes", 0) / 1024 ** 2
+        rate = f"{megabytes / wall:.1f}" if wall > 0 and megabytes else "-"
+        name = event["name"] + (" (pulada)" if event["args"].get("skipped") else "")
+        lines.append(f"{name:<28} {wall:>9.2f} {event['args']['cpu']:>8.2f} {megabytes:>9.1f} {rate:>8} {event['args']['subprocesses']:>6}")
+    total = sum(event["dur"] for event in events) / 1e6
+    lines.append(f"{'Total':<28} {total:>9.2f}")
+    
+    print("\n" + "\n".join(lines))
+    logging.info("Resumo de tempos:\n" + "\n".join(lines))
+
 def initialize_directories():
-    directories = [MAIN_DIR, SOURCE_DIR, COMPILERS_DIR, MINGW32_DIR, MINGW64_DIR, TEMP_DIR, OUTPUT_DIR]
+    directories = [MAIN_DIR, SOURCE_DIR, COMPILERS_DIR, TOOLCHAIN_STORE_DIR, TEMP_DIR, OUTPUT_DIR, DOWNLOAD_CACHE_DIR]
     for directory in directories:
         try:
             directory.mkdir(parents=True, exist_ok=True)
@@ -97,79 +613,662 @@ def initialize_directories():
 
 def locate_7zip():
     try:
-        for access_key in [winreg.KEY_WOW64_64KEY, winreg.KEY_WOW64_32KEY]:
-            try:
-                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\7-Zip", 0, winreg.KEY_READ | access_key)
-                path_value, _ = winreg.QueryValueEx(key, "Path")
-                winreg.CloseKey(key)
-                exe_path = Path(path_value) / "7z.exe"
-                if exe_path.exists():
-                    return str(exe_path)
-            except FileNotFoundError:
-                continue
-            except Exception as e:
-                logging.debug(f"Erro ao buscar 7-Zip no registro ({access_key}): {e}")
-                
-        common_paths = [
-            Path("C:\\Program Files\\7-Zip\\7z.exe"),
-            Path("C:\\Program Files (x86)\\7-Zip\\7z.exe")
-        ]
-        
-        for path in common_paths:
-            if path.exists():
-                return str(path)
-                
-        return None
+        return PLATFORM.locate_7zip()
     except Exception as e:
         logging.error(f"Erro ao localizar 7-Zip: {e}")
         return None
 
-def download_file(url, destination_path, max_retries=3):
+class DownloadProgress:
+    def __init__(self, names, refresh_interval=None):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.last_render = 0.0
+        self.refresh_interval = PROGRESS_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self.state = {name: (0, 0) for name in names}
+        self.milestones = {name: 0 for name in names}
+    
+    def update(self, name, downloaded, total_size):
+        with self.lock:
+            self.state[name] = (downloaded, total_size)
+            finished = total_size > 0 and downloaded >= total_size
+            
+            if total_size > 0:
+                milestone = int(downloaded * 100 / total_size) // PROGRESS_LOG_STEP * PROGRESS_LOG_STEP
+                if milestone > self.milestones[name]:
+                    self.milestones[name] = milestone
+                    logging.debug(f"Download de {name}: {milestone}% ({downloaded} de {total_size} bytes)")
+            
+            now = time.monotonic()
+            if finished or now - self.last_render >= self.refresh_interval:
+                self.last_render = now
+                self.render()
+    
+    def render(self):
+        parts = []
+        for name, (downloaded, total_size) in self.state.items():
+            if total_size > 0:
+                parts.append(f"{name} {(downloaded / total_size) * 100:.1f}%")
+            else:
+                parts.append(f"{name} {downloaded / 1024 ** 2:.1f} MB")
+        
+        received = sum(downloaded for downloaded, _ in self.state.values())
+        elapsed = max(time.monotonic() - self.started, 0.001)
+        print_status(f"Baixando: {' | '.join(parts)} - {received / elapsed / 1024 ** 2:.1f} MB/s", "progress", log=False)
+
+def retry_delay(attempt):
+    # Backoff exponencial com jitter para não sincronizar as tentativas
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+def wait_before_retry(url, destination, attempt, max_retries, error, cancel_event=None):
+    logging.error(f"Tentativa {attempt} falhou ao baixar {url}: {error}")
+    if attempt == max_retries:
+        print_status(f"Falha no download de {destination.name} após {max_retries} tentativas", "error")
+        return False
+    
+    delay = retry_delay(attempt)
+    logging.debug(f"Nova tentativa de {destination.name} em {delay:.1f}s")
+    if cancel_event is not None:
+        return not cancel_event.wait(delay)
+    time.sleep(delay)
+    return True
+
+
+class DownloadCancelled(Exception):
+    pass
+
+def open_url(url, start=0, end=None, timeout=60, validator=None):
+    request = urllib.request.Request(url)
+    if start > 0 or end is not None:
+        request.add_header("Range", f"bytes={start}-{'' if end is None else end}")
+        if validator:
+            # Se o arquivo remoto mudou, o servidor responde 200 com o conteúdo inteiro
+            request.add_header("If-Range", validator)
+    return urllib.request.urlopen(request, timeout=timeout)
+
+def response_validator(response):
+    # ETag forte ou Last-Modified identificam a versão do arquivo remoto; ETags
+    # fracas (W/) não valem para If-Range
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+def load_part_validator(validator_file, url):
+    try:
+        with open(validator_file, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return saved.get("validator") if saved.get("url") == url else None
+
+def save_part_validator(validator_file, url, validator):
+    if validator:
+        with open(validator_file, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "validator": validator}, f)
+    else:
+        validator_file.unlink(missing_ok=True)
+
+def response_total_size(response):
+    # Em respostas 206 o tamanho total vem no cabeçalho Content-Range ("bytes a-b/total")
+    content_range = response.headers.get("Content-Range", "")
+    if response.status == 206 and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    return int(response.headers.get("Content-Length", 0))
+
+def probe_remote_file(url):
+    try:
+        with open_url(url, 0, 0) as response:
+            return response_total_size(response), response.status == 206, response_validator(response)
+    except Exception as e:
+        logging.debug(f"Não foi possível consultar o tamanho de {url}: {e}")
+        return 0, False, None
+
+def download_stream(url, part_file, report, cancel_event=None, buffer_size=DOWNLOAD_BUFFER_SIZE):
+    # O validador (ETag/Last-Modified) da resposta original fica ao lado do .part;
+    # sem ele não há como saber se o trecho já baixado é da mesma versão
+    validator_file = part_file.with_name(part_file.name + ".validator")
+    offset = part_file.stat().st_size if part_file.exists() else 0
+    validator = load_part_validator(validator_file, url) if offset > 0 else None
+    if offset > 0 and not validator:
+        logging.debug(f"{part_file.name} sem validador do servidor, reiniciando do zero")
+        offset = 0
+    
+    try:
+        response = open_url(url, offset, validator=validator)
+    except urllib.error.HTTPError as e:
+        if e.code != 416:
+            raise
+        # Intervalo inválido: o arquivo parcial não corresponde mais ao remoto
+        logging.debug(f"Intervalo recusado para {part_file.name}, reiniciando do zero")
+        part_file.unlink(missing_ok=True)
+        offset = 0
+        response = open_url(url)
+    
+    with response:
+        if offset > 0 and response.status != 206:
+            # 200: o servidor não retoma ou o arquivo remoto mudou (If-Range)
+            logging.debug(f"{part_file.name} não pode ser retomado, reiniciando do zero")
+            offset = 0
+        elif offset > 0:
+            logging.info(f"Retomando {part_file.name} a partir de {offset} bytes")
+        if offset == 0:
+            save_part_validator(validator_file, url, response_validator(response))
+        
+        total_size = response_total_size(response)
+        downloaded = offset
+        # O hash é calculado durante o download; ao retomar, só o trecho já
+        # existente do .part precisa ser lido novamente
+        sha256_hash = hash_file_prefix(part_file, offset, buffer_size) if offset > 0 else hashlib.sha256()
+        
+        with open(part_file, "ab" if offset > 0 else "wb") as out_file:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled()
+                
+                buffer = response.read(buffer_size)
+                if not buffer:
+                    break
+                downloaded += len(buffer)
+                out_file.write(buffer)
+                sha256_hash.update(buffer)
+                report(downloaded, total_size)
+    
+    if total_size > 0 and downloaded != total_size:
+        raise IOError(f"download incompleto: {downloaded} de {total_size} bytes")
+    
+    validator_file.unlink(missing_ok=True)
+    return sha256_hash.hexdigest(), downloaded - offset
+
+def hash_file_prefix(file_path, length, buffer_size=HASH_BUFFER_SIZE):
+    sha256_hash = hashlib.sha256()
+    remaining = length
+    with open(file_path, "rb") as f:
+        while remaining > 0:
+            buffer = f.read(min(buffer_size, remaining))
+            if not buffer:
+                raise IOError(f"arquivo parcial menor que o esperado: {file_path}")
+            sha256_hash.update(buffer)
+            remaining -= len(buffer)
+    return sha256_hash
+
+def download_segmented(url, part_file, total_size, segments, report, cancel_event=None, buffer_size=DOWNLOAD_BUFFER_SIZE,
+                       validator=None):
+    state_file = part_file.with_name(part_file.name + ".segments")
+    state = None
+    
+    if state_file.exists() and part_file.exists():
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception as e:
+            logging.debug(f"Estado de segmentos inválido para {part_file.name}: {e}")
+        if state and (state.get("url") != url or state.get("size") != total_size or part_file.stat().st_size != total_size
+                      or not validator or state.get("validator") != validator):
+            state = None
+    
+    if state is None:
+        # Pré-aloca o arquivo inteiro para que cada segmento grave na sua posição
+        segment_size = -(-total_size // segments)
+        state = {
+            "url": url,
+            "size": total_size,
+            "validator": validator,
+            "segments": [[start, min(start + segment_size, total_size) - 1, 0] for start in range(0, total_size, segment_size)]
+        }
+        with open(part_file, "wb") as f:
+            f.truncate(total_size)
+    else:
+        logging.info(f"Retomando {part_file.name} em {len(state['segments'])} segmentos")
+    
+    lock = threading.Lock()
+    last_saved = [time.monotonic()]
+    
+    def save_state():
+        with open(state_file, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+    
+    def fetch_segment(segment):
+        start, end, done = segment
+        if start + done > end:
+            return
+        
+        with open_url(url, start + done, end, validator=validator) as response, open(part_file, "r+b") as out_file:
+            if response.status != 206:
+                raise IOError("o servidor ignorou o cabeçalho Range ou o arquivo remoto mudou")
+            out_file.seek(start + done)
+            
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled()
+                
+                buffer = response.read(buffer_size)
+                if not buffer:
+                    break
+                out_file.write(buffer)
+                
+                with lock:
+                    segment[2] += len(buffer)
+                    report(sum(item[2] for item in state["segments"]), total_size)
+                    if time.monotonic() - last_saved[0] > 1:
+                        out_file.flush()
+                        save_state()
+                        last_saved[0] = time.monotonic()
+        
+        if start + segment[2] <= end:
+            raise IOError(f"segmento {start}-{end} incompleto")
+    
+    resumed_bytes = sum(segment[2] for segment in state["segments"])
+    
+    try:
+        with ThreadPoolExecutor(max_workers=len(state["segments"]), thread_name_prefix="segment") as executor:
+            for future in [executor.submit(fetch_segment, segment) for segment in state["segments"]]:
+                future.result()
+    finally:
+        with lock:
+            save_state()
+    
+    state_file.unlink(missing_ok=True)
+    
+    # Os segmentos chegam fora de ordem, então o hash é feito numa única leitura
+    # do arquivo completo, que ainda está no cache de páginas do sistema
+    return calculate_sha256(part_file), total_size - resumed_bytes
+
+def download_file(url, destination_path, max_retries=3, progress=None, progress_name=None, cancel_event=None,
+                  segments=DOWNLOAD_SEGMENTS, buffer_size=DOWNLOAD_BUFFER_SIZE):
     destination = Path(destination_path)
-    if destination.exists():
-        logging.info(f"Arquivo já existe: {destination}")
-        return True
+    progress_name = progress_name or destination.name
+    # O download é gravado em um arquivo .part e só recebe o nome final quando
+    # termina; o .part é retomado com HTTP Range se a transferência cair
+    part_file = destination.with_name(destination.name + ".part")
+    state_file = part_file.with_name(part_file.name + ".segments")
+    destination.parent.mkdir(parents=True, exist_ok=True)
+        
+    if progress is None:
+        progress = DownloadProgress([progress_name])
+    
+    def report(downloaded, total_size):
+        progress.update(progress_name, downloaded, total_size)
         
     for attempt in range(1, max_retries + 1):
         try:
-            print_status(f"Baixando {destination.name}... ({attempt}/{max_retries})", "progress")
-            with urllib.request.urlopen(url, timeout=60) as response, open(destination, 'wb') as out_file:
-                total_size = int(response.headers.get('Content-Length', 0))
-                downloaded = 0
-                block_size = 8192
-                
-                while True:
-                    buffer = response.read(block_size)
-                    if not buffer:
-                        break
-                    downloaded += len(buffer)
-                    out_file.write(buffer)
-                    
-                    if total_size > 0:
-                        percent = (downloaded / total_size) * 100
-                        print_status(f"Baixando {destination.name}... {percent:.1f}% ({attempt}/{max_retries})", "progress")
+            if attempt > 1:
+                logging.info(f"Baixando {destination.name}... ({attempt}/{max_retries})")
             
+            started = time.perf_counter()
+            total_size, accepts_ranges, validator = probe_remote_file(url) if segments > 1 else (0, False, None)
+            if accepts_ranges and total_size >= SEGMENT_MIN_SIZE:
+                digest, transferred = download_segmented(url, part_file, total_size, segments, report, cancel_event, buffer_size,
+                                                         validator)
+            else:
+                if state_file.exists():
+                    # Um .part pré-alocado por segmentos não pode ser retomado sequencialmente
+                    state_file.unlink()
+                    part_file.unlink(missing_ok=True)
+                digest, transferred = download_stream(url, part_file, report, cancel_event, buffer_size)
+            elapsed = max(time.perf_counter() - started, 0.001)
+            
+            if digest is None:
+                raise IOError("não foi possível calcular o hash do download")
+            
+            os.replace(part_file, destination)
             print_status(f"Download de {destination.name} concluído", "success")
-            return True
+            logging.info(f"{destination.name}: {transferred} bytes em {elapsed:.2f}s ({transferred / elapsed / 1024 ** 2:.1f} MB/s)")
+            return digest
+        except DownloadCancelled:
+            logging.debug(f"Download de {destination.name} cancelado")
+            return None
+        except urllib.error.HTTPError as e:
+            # Erros do cliente (exceto timeout e limite de taxa) não melhoram com nova tentativa
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                logging.error(f"Falha definitiva ao baixar {url}: {e}")
+                print_status(f"Falha no download de {destination.name}: HTTP {e.code}", "error")
+                return None
+            if not wait_before_retry(url, destination, attempt, max_retries, e, cancel_event):
+                return None
         except Exception as e:
-            logging.error(f"Tentativa {attempt} falhou ao baixar {url}: {e}")
-            if attempt == max_retries:
-                print_status(f"Falha no download de {destination.name} após {max_retries} tentativas", "error")
-                return False
-            time.sleep(2)  # Espera antes de tentar novamente
+            if not wait_before_retry(url, destination, attempt, max_retries, e, cancel_event):
+                return None
 
-def extract_archive(archive_path, extract_to, seven_zip_path):
+def resource_sources(resource):
+    return list(resource.get("mirrors") or []) + [resource["url"]]
+
+def local_source_path(source):
+    # file:// e caminhos locais (inclusive C:\...) são lidos direto do disco
+    parsed = urllib.parse.urlsplit(source)
+    if parsed.scheme in ("http", "https"):
+        return None
+    if parsed.scheme == "file":
+        return Path(urllib.request.url2pathname(parsed.path))
+    return Path(source)
+
+def probe_source(source, probe_bytes=MIRROR_PROBE_BYTES, timeout=MIRROR_PROBE_TIMEOUT):
+    # Mede a latência até o primeiro byte e a vazão lendo o início do arquivo
+    probe = {"source": source, "ok": False, "latency": None, "throughput": None, "size": 0}
+    try:
+        started = time.perf_counter()
+        local_path = local_source_path(source)
+        if local_path:
+            probe["size"] = local_path.stat().st_size
+            with open(local_path, "rb") as f:
+                first_byte = time.perf_counter()
+                data = f.read(probe_bytes)
+        else:
+            with open_url(source, 0, probe_bytes - 1, timeout=timeout) as response:
+                first_byte = time.perf_counter()
+                probe["size"] = response_total_size(response)
+                data = response.read(probe_bytes)
+        finished = time.perf_counter()
+        
+        probe["latency"] = first_byte - started
+        probe["throughput"] = len(data) / max(finished - first_byte, 0.000001)
+        probe["ok"] = len(data) > 0 or probe["size"] == 0
+    except Exception as e:
+        logging.info(f"Fonte indisponível: {source} ({e})")
+    return probe
+
+def estimated_seconds(probe):
+    return probe["latency"] + probe["size"] / max(probe["throughput"], 1)
+
+def rank_sources(sources):
+    # Fontes que responderam, da mais rápida para a mais lenta estimada; as que
+    # falharam na sondagem ficam no fim, ainda como última tentativa
+    if len(sources) == 1:
+        return sources
+    with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="probe") as executor:
+        probes = list(executor.map(probe_source, sources))
+    
+    available = sorted((probe for probe in probes if probe["ok"]), key=estimated_seconds)
+    for probe in available:
+        logging.info(f"Fonte {probe['source']}: latência {probe['latency'] * 1000:.0f} ms, "
+                     f"{probe['throughput'] / 1024 ** 2:.1f} MB/s, estimativa {estimated_seconds(probe):.1f}s")
+    return [probe["source"] for probe in available] + [probe["source"] for probe in probes if not probe["ok"]]
+
+def copy_local_source(path, destination_path, progress=None, progress_name=None, cancel_event=None,
+                      buffer_size=DOWNLOAD_BUFFER_SIZE):
+    destination = Path(destination_path)
+    part_file = destination.with_name(destination.name + ".part")
+    try:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        total_size = Path(path).stat().st_size
+        digest = hashlib.sha256()
+        copied = 0
+        with open(path, "rb") as src, open(part_file, "wb") as dst:
+            for block in iter(lambda: src.read(buffer_size), b""):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled()
+                digest.update(block)
+                dst.write(block)
+                copied += len(block)
+                if progress is not None:
+                    progress.update(progress_name or destination.name, copied, total_size)
+        os.replace(part_file, destination)
+        return digest.hexdigest()
+    except DownloadCancelled:
+        part_file.unlink(missing_ok=True)
+        return None
+    except OSError as e:
+        logging.warning(f"Falha ao copiar {path}: {e}")
+        part_file.unlink(missing_ok=True)
+        return None
+
+def download_from_sources(resource, destination_path, expected_hash=None, progress=None, progress_name=None,
+                          cancel_event=None):
+    # Tenta as fontes na ordem da sondagem até uma entregar o conteúdo esperado
+    destination = Path(destination_path)
+    if expected_hash:
+        sources = rank_sources(resource_sources(resource))
+    else:
+        # Sem SHA-256 conhecido, a origem oficial é sempre tentada primeiro; os
+        # mirrors (definidos pelo operador, nunca pela API do daemon) só entram
+        # quando ela não responde, como numa máquina sem rede
+        sources = [resource["url"]] + list(resource.get("mirrors") or [])
+    
+    for position, source in enumerate(sources):
+        if cancel_event is not None and cancel_event.is_set():
+            return None, None
+        # Com outras fontes ainda disponíveis, não vale insistir na mesma
+        max_retries = 3 if position == len(sources) - 1 else 1
+        local_path = local_source_path(source)
+        if local_path:
+            actual_hash = copy_local_source(local_path, destination, progress, progress_name, cancel_event)
+        else:
+            resumed = destination.with_name(destination.name + ".part").exists()
+            actual_hash = download_file(source, destination, max_retries, progress, progress_name, cancel_event)
+            if resumed and expected_hash and actual_hash not in (None, expected_hash):
+                # O .part retomado pode ser de outra versão ou estar corrompido:
+                # uma nova tentativa do zero antes de descartar a fonte
+                print_status(f"{destination.name} retomado não confere com o SHA-256 esperado, baixando do zero", "warning")
+                destination.unlink(missing_ok=True)
+                actual_hash = download_file(source, destination, max_retries, progress, progress_name, cancel_event)
+        
+        if actual_hash is None:
+            logging.warning(f"Falha ao obter {destination.name} de {source}")
+            continue
+        if expected_hash and actual_hash != expected_hash:
+            print_status(f"{destination.name} de {source} não confere com o SHA-256 esperado", "warning")
+            destination.unlink(missing_ok=True)
+            continue
+        if source != resource["url"]:
+            if expected_hash:
+                logging.info(f"{destination.name} obtido do mirror {source}")
+            else:
+                print_status(f"{destination.name} obtido do mirror {source} sem SHA-256 conhecido; "
+                             f"o hash será fixado a partir dele", "warning")
+        return actual_hash, source
+    
+    return None, None
+
+def load_cache_index():
+    try:
+        with open(CACHE_INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        index = {}
+    except Exception as e:
+        logging.warning(f"Índice do cache inválido, será recriado: {e}")
+        index = {}
+    
+    index.setdefault("objects", {})
+    index.setdefault("urls", {})
+    return index
+
+def save_cache_index(index):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_index = CACHE_INDEX_FILE.with_name(CACHE_INDEX_FILE.name + ".tmp")
+    with open(temp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_index, CACHE_INDEX_FILE)
+
+def cache_object_path(sha256):
+    return DOWNLOAD_CACHE_DIR / sha256[:2] / sha256
+
+def cache_lookup(sha256):
+    with cache_lock:
+        index = load_cache_index()
+        entry = index["objects"].get(sha256)
+        cached = cache_object_path(sha256)
+        
+        if not entry or not cached.exists():
+            return None
+        if cached.stat().st_size != entry["size"]:
+            logging.warning(f"Objeto do cache com tamanho inesperado, descartando: {cached}")
+            cached.unlink(missing_ok=True)
+            del index["objects"][sha256]
+            save_cache_index(index)
+            return None
+        
+        entry["last_used"] = time.time()
+        save_cache_index(index)
+        return cached
+
+def cache_store(file_path, sha256, url):
+    source = Path(file_path)
+    cached = cache_object_path(sha256)
+    
+    with cache_lock:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        if not cached.exists():
+            # Move para o cache e devolve um link para o destino original
+            os.replace(source, cached)
+            place_from_cache(cached, source)
+        
+        index = load_cache_index()
+        index["objects"][sha256] = {
+            "size": cached.stat().st_size,
+            "name": source.name,
+            "last_used": time.time()
+        }
+        # O primeiro hash de uma URL fica fixado; nunca é substituído aqui
+        index["urls"].setdefault(url, sha256)
+        save_cache_index(index)
+    
+    logging.debug(f"{source.name} armazenado no cache: {cached}")
+
+def place_from_cache(cached, destination_path):
+    destination = Path(destination_path)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(cached, destination)
+    except OSError:
+        shutil.copy2(cached, destination)
+
+def lru_victims(entries, max_bytes):
+    # Entradas usadas há mais tempo que precisam sair para caber no limite
+    total = sum(entry["size"] for entry in entries.values())
+    victims = []
+    for key in sorted(entries, key=lambda key: entries[key]["last_used"]):
+        if total <= max_bytes:
+            break
+        victims.append(key)
+        total -= entries[key]["size"]
+    return victims
+
+def evict_cache(max_bytes=CACHE_MAX_BYTES):
+    with cache_lock:
+        index = load_cache_index()
+        objects = index["objects"]
+        
+        for sha256 in lru_victims(objects, max_bytes):
+            cache_object_path(sha256).unlink(missing_ok=True)
+            del objects[sha256]
+            logging.info(f"Removido do cache: {sha256}")
+        
+        # Os hashes fixados por URL ("urls") não saem com os objetos: após a
+        # remoção, o próximo download ainda precisa conferir com eles
+        save_cache_index(index)
+
+def fetch_resource(resource, destination_path, progress=None, progress_name=None, cancel_event=None):
+    url = resource["url"]
+    destination = Path(destination_path)
+    
+    with cache_lock:
+        expected_hash = resource["sha256"] or load_cache_index()["urls"].get(url)
+    
+    if expected_hash:
+        cached = cache_lookup(expected_hash)
+        if cached:
+            place_from_cache(cached, destination)
+            if progress is not None:
+                size = destination.stat().st_size
+                progress.update(progress_name or destination.name, size, size)
+            print_status(f"{destination.name} obtido do cache", "success")
+            return True
+    
+    # O download devolve o SHA-256 calculado durante a transferência
+    with timed(f"download {destination.name}", "download") as record:
+        actual_hash, source = download_from_sources(resource, destination, expected_hash, progress, progress_name, cancel_event)
+        record.update(bytes=path_size([destination]), source=source)
+    if actual_hash is None:
+        if expected_hash:
+            print_status(f"Nenhuma fonte entregou {destination.name} com o SHA-256 esperado ({expected_hash})", "error")
+        return False
+    
+    if not expected_hash:
+        print_status(f"SHA-256 de {destination.name} fixado no primeiro download: {actual_hash} "
+                     f"(confira com a origem e registre em RESOURCES)", "warning")
+    cache_store(destination, actual_hash, url)
+    evict_cache()
+    return True
+
+def resource_paths(resources=None, destination_dir=None):
+    resources = RESOURCES if resources is None else resources
+    destination_dir = Path(destination_dir or TEMP_DIR)
+    return {name: destination_dir / os.path.basename(resource["url"]) for name, resource in resources.items()}
+
+def fetch_all_resources(resources=None, destination_dir=None, max_workers=DOWNLOAD_WORKERS, on_fetched=None, cancel_event=None):
+    resources = RESOURCES if resources is None else resources
+    destination_dir = Path(destination_dir or TEMP_DIR)
+    destination_dir.mkdir(parents=True, exist_ok=True)
+    
+    downloads = resource_paths(resources, destination_dir)
+    progress = DownloadProgress(resources.keys())
+    cancel_event = cancel_event or threading.Event()
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download") as executor:
+        futures = {
+            executor.submit(fetch_resource, resource, downloads[name], progress, name, cancel_event): name
+            for name, resource in resources.items()
+        }
+        
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                success = future.result()
+            except Exception as e:
+                logging.exception(f"Exceção ao obter {name}")
+                success = False
+            
+            if not success:
+                # Falha rápida: interrompe os downloads em andamento e os pendentes
+                cancel_event.set()
+                for pending in futures:
+                    pending.cancel()
+                print_status(f"Falha ao obter o recurso {name}", "error")
+                return None
+            
+            if on_fetched:
+                on_fetched(name, downloads[name])
+    
+    print_status("Todos os recursos foram obtidos", "success")
+    return downloads
+
+def extract_zip(archive, extract_path):
+    # O .zip do ohook é pequeno e o zipfile já normaliza caminhos perigosos
+    with zipfile.ZipFile(archive) as zip_file:
+        zip_file.extractall(extract_path)
+
+def extract_with_7zip(archive, extract_path, seven_zip_path, include_patterns=None):
+    command = [
+        seven_zip_path, "x", str(archive), f"-o{extract_path}", "-y",
+        f"-mmt={SEVEN_ZIP_THREADS}", "-bb1", "-bsp0"
+    ]
+    if include_patterns:
+        # Lista de inclusão em arquivo para não estourar o limite da linha de comando
+        list_file = TEMP_DIR / f"{archive.name}.include.txt"
+        list_file.parent.mkdir(parents=True, exist_ok=True)
+        list_file.write_text("\n".join(include_patterns) + "\n", encoding="utf-8")
+        command.append(f"-i@{list_file}")
+    # A lista de arquivos extraídos vai para o log próprio do pacote
+    capture = run_streamed(command, BUILD_LOGS_DIR / f"extract-{archive.name}.log", f"7z {archive.name}",
+                           parse_diagnostics=False)
+    if capture["returncode"] != 0:
+        raise subprocess.CalledProcessError(capture["returncode"], command, stderr="\n".join(capture["tail"]))
+
+def extract_archive(archive_path, extract_to, seven_zip_path, include_patterns=None):
     try:
         extract_path = Path(extract_to)
         archive = Path(archive_path)
         
         print_status(f"Extraindo {archive.name}...", "progress")
         
-        process = subprocess.run(
-            [seven_zip_path, "x", str(archive), f"-o{extract_path}", "-y"],
-            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            encoding='utf-8', errors='replace'
-        )
+        if zipfile.is_zipfile(archive):
+            extract_zip(archive, extract_path)
+        else:
+            extract_with_7zip(archive, extract_path, seven_zip_path, include_patterns)
         
         if extract_path.exists():
             print_status(f"Extração de {archive.name} concluída", "success")
@@ -184,7 +1283,232 @@ def extract_archive(archive_path, extract_to, seven_zip_path):
         print_status(f"Erro ao extrair {archive_path}: {str(e)}", "error")
         return False
 
-def calculate_sha256(file_path):
+def extract_archives_parallel(jobs, max_workers=EXTRACT_WORKERS):
+    # Cada tarefa é (função, argumentos) e deve devolver True/False
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract") as executor:
+        futures = [executor.submit(function, *args) for function, args in jobs]
+        results = [future.result() for future in futures]
+    return all(results)
+
+def toolchain_patterns(name):
+    toolchain = TOOLCHAINS[name]
+    return [pattern.format(root=toolchain["root"], triplet=toolchain["triplet"]) for pattern in TOOLCHAIN_PATTERNS]
+
+def load_toolchain_manifest(toolchain_dir):
+    try:
+        with open(Path(toolchain_dir) / TOOLCHAIN_MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Manifesto do toolchain inválido em {toolchain_dir}: {e}")
+        return None
+
+def write_toolchain_manifest(toolchain_dir, archive, patterns):
+    toolchain_dir = Path(toolchain_dir)
+    files = {}
+    for path in toolchain_files(toolchain_dir):
+        files[path.relative_to(toolchain_dir).as_posix()] = path.stat().st_size
+    
+    manifest = {"archive": Path(archive).name, "version": toolchain_dir.parent.name, "patterns": patterns, "files": files}
+    with open(toolchain_dir / TOOLCHAIN_MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logging.info(f"Manifesto de {toolchain_dir.name} registrado: {len(files)} arquivos")
+
+def toolchain_files(toolchain_dir):
+    metadata = (TOOLCHAIN_MANIFEST_FILE, INTEGRITY_INDEX_FILE)
+    return [path for path in Path(toolchain_dir).rglob("*") if path.is_file() and path.name not in metadata]
+
+def hash_file(file_path, buffer_size=HASH_BUFFER_SIZE):
+    # Sem trace nem log por arquivo: os toolchains têm dezenas de milhares deles
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for byte_block in iter(lambda: f.read(buffer_size), b""):
+            digest.update(byte_block)
+    return digest.hexdigest()
+
+def load_integrity_index(toolchain_dir):
+    try:
+        with open(Path(toolchain_dir) / INTEGRITY_INDEX_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)["files"]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Índice de integridade inválido em {toolchain_dir}: {e}")
+        return None
+
+def save_integrity_index(toolchain_dir, entries):
+    index_file = Path(toolchain_dir) / INTEGRITY_INDEX_FILE
+    temp_index = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+    with open(temp_index, "w", encoding="utf-8") as f:
+        json.dump({"files": entries}, f)
+    os.replace(temp_index, index_file)
+
+def build_integrity_index(toolchain_dir, max_workers=INTEGRITY_WORKERS):
+    toolchain_dir = Path(toolchain_dir)
+    files = toolchain_files(toolchain_dir)
+    entries = {}
+    with timed(f"integrity index {toolchain_dir.name}", "hash") as record, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="integrity") as executor:
+        for path, digest in zip(files, executor.map(hash_file, files)):
+            stat = path.stat()
+            entries[path.relative_to(toolchain_dir).as_posix()] = [stat.st_size, stat.st_mtime_ns, digest]
+        record["bytes"] = sum(entry[0] for entry in entries.values())
+    
+    save_integrity_index(toolchain_dir, entries)
+    logging.info(f"Índice de integridade de {toolchain_dir.name}: {len(entries)} arquivos")
+    return entries
+
+def verify_toolchain_integrity(toolchain_dir, max_workers=INTEGRITY_WORKERS):
+    # Devolve a lista de problemas, ou None se o toolchain não tiver índice
+    toolchain_dir = Path(toolchain_dir)
+    entries = load_integrity_index(toolchain_dir)
+    if entries is None:
+        return None
+    
+    problems = []
+    changed = []
+    with timed(f"integrity check {toolchain_dir.name}", "hash") as record:
+        for relative_path, (size, mtime_ns, _) in entries.items():
+            try:
+                stat = (toolchain_dir / relative_path).stat()
+            except FileNotFoundError:
+                problems.append(f"{relative_path}: ausente")
+                continue
+            if stat.st_size != size:
+                problems.append(f"{relative_path}: tamanho {stat.st_size}, esperado {size}")
+            elif stat.st_mtime_ns != mtime_ns:
+                changed.append((relative_path, stat))
+        
+        if changed:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="integrity") as executor:
+                digests = executor.map(lambda item: hash_file(toolchain_dir / item[0]), changed)
+                for (relative_path, stat), digest in zip(changed, digests):
+                    if digest != entries[relative_path][2]:
+                        problems.append(f"{relative_path}: conteúdo alterado")
+                    else:
+                        # Mesmo conteúdo com outra data: a próxima verificação não refaz o hash
+                        entries[relative_path] = [stat.st_size, stat.st_mtime_ns, digest]
+            save_integrity_index(toolchain_dir, entries)
+        record.update(files=len(entries), rehashed=len(changed))
+    
+    logging.info(f"Integridade de {toolchain_dir.name}: {len(entries)} arquivos, {len(changed)} com hash recalculado, {len(problems)} problema(s)")
+    return problems
+
+def toolchain_subset_complete(toolchain_dir, archive, patterns):
+    toolchain_dir = Path(toolchain_dir)
+    manifest = load_toolchain_manifest(toolchain_dir)
+    if not manifest or manifest.get("archive") != Path(archive).name or manifest.get("patterns") != patterns:
+        return False
+    
+    problems = verify_toolchain_integrity(toolchain_dir)
+    if problems is None:
+        # Versão extraída antes do índice: confere os tamanhos do manifesto e cria o índice
+        for relative_path, size in manifest["files"].items():
+            path = toolchain_dir / relative_path
+            if not path.is_file() or path.stat().st_size != size:
+                logging.info(f"Toolchain {toolchain_dir.name} incompleto: {relative_path}")
+                return False
+        build_integrity_index(toolchain_dir)
+    elif problems:
+        logging.info(f"Toolchain {toolchain_dir.name} incompleto: {problems[0]}")
+        return False
+    return bool(manifest["files"])
+
+def is_link(path):
+    # Cobre links simbólicos e junções do Windows
+    path = Path(path)
+    return os.path.lexists(path) and os.path.realpath(path) != os.path.join(os.path.realpath(path.parent), path.name)
+
+def ensure_link(link, target):
+    link, target = Path(link), Path(target)
+    if is_link(link):
+        if os.path.realpath(link) == os.path.realpath(target):
+            return False
+        PLATFORM.remove_link(link)
+    elif link.exists():
+        if link.parent == COMPILERS_DIR:
+            # Toolchain extraído direto em Compiladores por versões anteriores do script
+            logging.info(f"Removendo extração antiga de toolchain em {link}")
+            shutil.rmtree(link)
+        else:
+            raise FileExistsError(f"{link} já existe e não é um link")
+    
+    link.parent.mkdir(parents=True, exist_ok=True)
+    PLATFORM.create_link(link, target)
+    return True
+
+def toolchain_version(name, patterns, archive=None):
+    # A versão identifica o conteúdo do pacote e o subconjunto extraído
+    digest = resource_digest(RESOURCES[name]) or (archive and calculate_sha256(archive))
+    if not digest:
+        return None
+    identity = json.dumps({"archive": digest, "patterns": patterns}, sort_keys=True)
+    return f"{name}-{hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]}"
+
+def prune_toolchain_store(name, keep=None):
+    # Remove as versões menos usadas recentemente, preservando a que está em uso
+    keep = TOOLCHAIN_STORE_KEEP if keep is None else keep
+    current = os.path.realpath(TOOLCHAINS[name]["dir"])
+    versions = sorted(
+        (path for path in TOOLCHAIN_STORE_DIR.glob(f"{name}-*") if path.is_dir()),
+        key=lambda path: path.stat().st_mtime, reverse=True
+    )
+    for path in versions[keep:]:
+        if current.startswith(os.path.realpath(path) + os.sep):
+            continue
+        logging.info(f"Removendo versão antiga do toolchain: {path.name}")
+        shutil.rmtree(path, ignore_errors=True)
+
+def extract_toolchain(name, archive, seven_zip_path, selective=None):
+    selective = SELECTIVE_EXTRACTION if selective is None else selective
+    patterns = toolchain_patterns(name) if selective else []
+    version_dir = TOOLCHAIN_STORE_DIR / toolchain_version(name, patterns, archive)
+    
+    # Jobs simultâneos do daemon não extraem a mesma versão duas vezes
+    with ProcessLock(TOOLCHAIN_STORE_DIR / f".{name}.lock"):
+        return install_toolchain_version(name, archive, seven_zip_path, patterns, version_dir)
+
+def installed_toolchain_dir(name, selective=None):
+    # Versão do toolchain já presente no store para o pacote atual, se houver
+    selective = SELECTIVE_EXTRACTION if selective is None else selective
+    version = toolchain_version(name, toolchain_patterns(name) if selective else [])
+    if not version:
+        return None
+    toolchain_dir = TOOLCHAIN_STORE_DIR / version / TOOLCHAINS[name]["root"]
+    return toolchain_dir if load_toolchain_manifest(toolchain_dir) else None
+
+def active_toolchain_dir(name):
+    # Builds simultâneos com versões diferentes do toolchain (modo lote) não
+    # podem depender do link compartilhado em Compiladores, que aponta para a
+    # última versão instalada
+    return installed_toolchain_dir(name) or TOOLCHAINS[name]["dir"]
+
+def install_toolchain_version(name, archive, seven_zip_path, patterns, version_dir):
+    toolchain = TOOLCHAINS[name]
+    if toolchain_subset_complete(version_dir / toolchain["root"], archive, patterns):
+        print_status(f"Toolchain {name} já extraído e completo ({version_dir.name})", "success")
+    else:
+        # Extrai em um diretório provisório e publica a versão de uma só vez
+        staging_dir = TOOLCHAIN_STORE_DIR / f".tmp-{version_dir.name}-{os.getpid()}"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        if not extract_archive(archive, staging_dir, seven_zip_path, patterns or None):
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return False
+        
+        write_toolchain_manifest(staging_dir / toolchain["root"], archive, patterns)
+        build_integrity_index(staging_dir / toolchain["root"])
+        if version_dir.exists():
+            shutil.rmtree(version_dir)
+        os.replace(staging_dir, version_dir)
+    
+    os.utime(version_dir)
+    if ensure_link(toolchain["dir"], version_dir / toolchain["root"]):
+        logging.info(f"{toolchain['dir']} aponta para {version_dir.name}")
+    prune_toolchain_store(name)
+    return True
+
+def calculate_sha256(file_path, buffer_size=HASH_BUFFER_SIZE, use_mmap=None):
     try:
         file = Path(file_path)
         if not file.exists():
@@ -192,11 +1516,23 @@ def calculate_sha256(file_path):
             return None
             
         sha256_hash = hashlib.sha256()
+        size = file.stat().st_size
+        if use_mmap is None:
+            use_mmap = size >= HASH_MMAP_MIN_SIZE
+        started = time.perf_counter()
         
-        with open(file, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
+        with timed(f"sha256 {file.name}", "hash") as record, open(file, "rb") as f:
+            record.update(bytes=size, mmap=bool(use_mmap))
+            if use_mmap and size > 0:
+                # O arquivo mapeado é entregue inteiro ao hashlib, sem cópias por bloco
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    sha256_hash.update(mapped)
+            else:
+                for byte_block in iter(lambda: f.read(buffer_size), b""):
+                    sha256_hash.update(byte_block)
         
+        elapsed = max(time.perf_counter() - started, 0.000001)
+        logging.info(f"SHA-256 de {file.name}: {size} bytes em {elapsed:.3f}s ({size / elapsed / 1024 ** 2:.1f} MB/s)")
         return sha256_hash.hexdigest()
     except Exception as e:
         logging.error(f"Erro ao calcular hash SHA-256 para {file_path}: {e}")
@@ -223,22 +1559,15 @@ def set_fixed_date_thread():
 def set_timezone_and_fixed_time():
     global keep_date_fixed
     global date_thread
+    global clock_modified
     
     try:
         print_status("Configurando fuso horário para UTC...", "progress")
-        result = subprocess.run(
-            ["powershell", "-Command", "Set-TimeZone -Id 'UTC'"],
-            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            encoding='utf-8', errors='replace'
-        )
-        
-        if result.returncode == 0:
-            print_status("Fuso horário configurado para UTC", "success")
-        else:
-            print_status(f"Erro ao configurar fuso horário: {result.stderr}", "error")
-            return False
+        PLATFORM.set_timezone_utc()
+        print_status("Fuso horário configurado para UTC", "success")
         
         print_status("Iniciando processo para manter data fixa em 2023-08-07 12:00 UTC...", "progress")
+        clock_modified = True
         keep_date_fixed = True
         date_thread = threading.Thread(target=set_fixed_date_thread, daemon=True)
         date_thread.start()
@@ -264,8 +1593,13 @@ def set_timezone_and_fixed_time():
 
 def restore_time():
     global keep_date_fixed
+    global clock_modified
     
     keep_date_fixed = False
+    if not clock_modified:
+        # Nada a restaurar (modo determinístico ou data nunca alterada)
+        return True
+    
     if date_thread and date_thread.is_alive():
         time.sleep(1)
     
@@ -283,6 +1617,7 @@ def restore_time():
             subprocess.run(cmd, check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             time.sleep(1)
         
+        clock_modified = False
         print_status("Data e hora do sistema restauradas", "success")
         return True
     except Exception as e:
@@ -290,34 +1625,134 @@ def restore_time():
         print_status("A data e hora precisam ser ajustadas manualmente", "warning")
         return False
 
+def build_environment(timestamp_mode):
+    env = os.environ.copy()
+    if timestamp_mode == "deterministic":
+        env["SOURCE_DATE_EPOCH"] = str(int(BUILD_TIMESTAMP.timestamp()))
+        env["TZ"] = "UTC"
+    return env
+
+def pe_rva_to_offset(sections, rva):
+    for virtual_address, virtual_size, raw_pointer, raw_size in sections:
+        if virtual_address <= rva < virtual_address + max(virtual_size, raw_size):
+            return raw_pointer + (rva - virtual_address)
+    return None
+
+def pe_checksum(data, checksum_offset):
+    # Algoritmo do CheckSum do cabeçalho opcional (soma de palavras de 16 bits
+    # com dobra do carry, ignorando o próprio campo, somada ao tamanho do arquivo)
+    padded = bytes(data) + b"\0" * (len(data) % 2)
+    words = struct.unpack(f"<{len(padded) // 2}H", padded)
+    skip = checksum_offset // 2
+    
+    total = sum(words) - words[skip] - words[skip + 1]
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return total + len(data)
+
+def normalize_pe_timestamps(file_path, timestamp=BUILD_TIMESTAMP):
+    timestamp = int(timestamp.timestamp())
+    path = Path(file_path)
+    data = bytearray(path.read_bytes())
+    
+    if data[:2] != b"MZ":
+        raise ValueError(f"{path.name} não é um arquivo PE")
+    pe_offset = struct.unpack_from("<I", data, 0x3C)[0]
+    if data[pe_offset:pe_offset + 4] != b"PE\0\0":
+        raise ValueError(f"{path.name} não tem assinatura PE")
+    
+    coff_offset = pe_offset + 4
+    number_of_sections, = struct.unpack_from("<H", data, coff_offset + 2)
+    optional_size, = struct.unpack_from("<H", data, coff_offset + 16)
+    optional_offset = coff_offset + 20
+    magic, = struct.unpack_from("<H", data, optional_offset)
+    if magic == 0x10B:
+        directories_offset = optional_offset + 96
+    elif magic == 0x20B:
+        directories_offset = optional_offset + 112
+    else:
+        raise ValueError(f"{path.name} tem cabeçalho opcional desconhecido: {magic:#x}")
+    
+    checksum_offset = optional_offset + 64
+    directory_count, = struct.unpack_from("<I", data, directories_offset - 4)
+    section_offset = optional_offset + optional_size
+    sections = []
+    for index in range(number_of_sections):
+        virtual_size, virtual_address, raw_size, raw_pointer = struct.unpack_from("<IIII", data, section_offset + index * 40 + 8)
+        sections.append((virtual_address, virtual_size, raw_pointer, raw_size))
+    
+    # Campos TimeDateStamp: cabeçalho COFF e diretórios de exportação, recursos e depuração
+    stamp_offsets = [coff_offset + 4]
+    
+    def directory(index):
+        if index >= directory_count:
+            return None, 0
+        rva, size = struct.unpack_from("<II", data, directories_offset + index * 8)
+        if not rva:
+            return None, 0
+        return pe_rva_to_offset(sections, rva), size
+    
+    for index in (0, 2):
+        offset, _ = directory(index)
+        if offset is not None:
+            stamp_offsets.append(offset + 4)
+    
+    debug_offset, debug_size = directory(6)
+    if debug_offset is not None:
+        stamp_offsets.extend(debug_offset + entry * 28 + 4 for entry in range(debug_size // 28))
+    
+    # Campos zerados pelo linker continuam zerados
+    changes = {}
+    for offset in stamp_offsets:
+        previous, = struct.unpack_from("<I", data, offset)
+        if previous and previous != timestamp:
+            changes[offset] = previous
+            struct.pack_into("<I", data, offset, timestamp)
+    
+    old_checksum, = struct.unpack_from("<I", data, checksum_offset)
+    if old_checksum:
+        struct.pack_into("<I", data, checksum_offset, pe_checksum(data, checksum_offset))
+    
+    if changes or struct.unpack_from("<I", data, checksum_offset)[0] != old_checksum:
+        temp_file = path.with_name(path.name + ".tmp")
+        temp_file.write_bytes(data)
+        os.replace(temp_file, path)
+        logging.info(f"Carimbos de data normalizados em {path.name}: {len(changes)} campo(s)")
+    return changes
+
+def managed_toolchains():
+    # Toolchains baixados e extraídos pelo script (nenhum quando o sistema já fornece um)
+    return {} if PLATFORM.uses_host_toolchain else TOOLCHAINS
+
+def required_resources():
+    return {name: resource for name, resource in RESOURCES.items() if name not in TOOLCHAINS or name in managed_toolchains()}
+
+def pending_resources():
+    # Toolchains já instalados no store (por exemplo, importados de um pacote
+    # offline) não precisam do pacote original
+    return {
+        name: resource for name, resource in required_resources().items()
+        if name not in TOOLCHAINS or not installed_toolchain_dir(name)
+    }
+
+def compilation_links():
+    # Os links dos toolchains apontam direto para a versão no store
+    links = [
+        (PLATFORM.toolchain_links[name], Path(os.path.realpath(active_toolchain_dir(name))))
+        for name in managed_toolchains()
+    ]
+    links.append((OHOOK_COMPILE_DIR, SOURCE_DIR))
+    return [(link, target) for link, target in links if link != target]
+
 def setup_compilation_environment():
     try:
-        # Criar link simbólico para mingw64 em C:\mingw64 como exigido pelas instruções
-        if not Path("C:\\mingw64").exists():
-            print_status("Configurando ambiente para compilação - mingw64...", "progress")
-            subprocess.run(
-                ["cmd", "/c", f"mklink /J C:\\mingw64 {MINGW64_DIR}"],
-                check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            print_status("Link simbólico para mingw64 criado", "success")
-        
-        # Criar link simbólico para mingw32 em C:\mingw32 como exigido pelas instruções
-        if not Path("C:\\mingw32").exists():
-            print_status("Configurando ambiente para compilação - mingw32...", "progress")
-            subprocess.run(
-                ["cmd", "/c", f"mklink /J C:\\mingw32 {MINGW32_DIR}"],
-                check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            print_status("Link simbólico para mingw32 criado", "success")
-        
-        # Criar link simbólico para ohook em C:\ohook como exigido pelas instruções
-        if not OHOOK_COMPILE_DIR.exists():
-            print_status("Configurando ambiente para compilação - ohook...", "progress")
-            subprocess.run(
-                ["cmd", "/c", f"mklink /J C:\\ohook {SOURCE_DIR}"],
-                check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-            print_status("Link simbólico para ohook criado", "success")
+        # Criar links para os toolchains e para o ohook nos caminhos exigidos pelas
+        # instruções; links que já apontam para o destino certo são mantidos
+        for link, target in compilation_links():
+            if ensure_link(link, target):
+                print_status(f"Link simbólico para {link.name} criado", "success")
+            else:
+                logging.debug(f"Link {link} já aponta para {target}")
         
         return True
     except subprocess.CalledProcessError as e:
@@ -327,26 +1762,164 @@ def setup_compilation_environment():
         print_status(f"Erro ao configurar ambiente de compilação: {str(e)}", "error")
         return False
 
-def compile_sppc_dll():
+def parse_diagnostic(line):
+    match = GCC_DIAGNOSTIC.match(line)
+    if match:
+        diagnostic = match.groupdict()
+        diagnostic["line"] = int(diagnostic["line"])
+        diagnostic["column"] = int(diagnostic["column"]) if diagnostic["column"] else None
+        if diagnostic["severity"] == "fatal error":
+            diagnostic["severity"] = "error"
+        return diagnostic
+    
+    for pattern in (LINKER_DIAGNOSTIC, MAKE_DIAGNOSTIC):
+        match = pattern.match(line)
+        if match:
+            return {"file": match.groupdict().get("file"), "line": None, "column": None,
+                    "severity": "error", "message": match.group("message"), "flag": None}
+    return None
+
+def open_output_log(log_path):
+    # Cada execução começa um arquivo novo; o conteúdo anterior vai para .1, .2, ...
+    handler = logging.handlers.RotatingFileHandler(
+        str(log_path), maxBytes=BUILD_LOG_MAX_BYTES, backupCount=BUILD_LOG_BACKUPS,
+        encoding="utf-8", delay=True
+    )
+    if Path(log_path).exists() and Path(log_path).stat().st_size > 0:
+        handler.doRollover()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    output_log = logging.Logger(f"output.{Path(log_path).stem}")
+    output_log.propagate = False
+    output_log.addHandler(handler)
+    return output_log
+
+def run_streamed(command, log_path, name, cwd=None, env=None, parse_diagnostics=True):
+    # Lê a saída linha a linha enquanto o processo roda: tudo vai para o log da
+    # execução, só as últimas linhas ficam em memória e avisos/erros do
+    # compilador aparecem no console assim que chegam
+    log_path = Path(log_path)
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    output_log = open_output_log(log_path)
+    tail = deque(maxlen=BUILD_LOG_TAIL)
+    counts = {"error": 0, "warning": 0, "note": 0}
+    diagnostics = []
+    
+    try:
+        with subprocess.Popen(
+            command, cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            encoding='utf-8', errors='replace'
+        ) as process:
+            for line in process.stdout:
+                line = line.rstrip()
+                if not line:
+                    continue
+                output_log.info(line)
+                tail.append(line)
+                
+                diagnostic = parse_diagnostic(line) if parse_diagnostics else None
+                if diagnostic:
+                    counts[diagnostic["severity"]] += 1
+                    if diagnostic["severity"] != "note" and len(diagnostics) < BUILD_DIAGNOSTICS_MAX:
+                        diagnostics.append(diagnostic)
+                    if diagnostic["severity"] == "error":
+                        logging.error(f"[{name}] {line}")
+                    elif diagnostic["severity"] == "warning":
+                        logging.warning(f"[{name}] {line}")
+            returncode = process.wait()
+    finally:
+        for handler in output_log.handlers:
+            handler.close()
+    
+    summary = {"returncode": returncode, "log": str(log_path), "counts": counts, "diagnostics": diagnostics}
+    if parse_diagnostics:
+        with open(log_path.with_suffix(".diagnostics.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        logging.info(f"{name}: {counts['error']} erro(s), {counts['warning']} aviso(s); log em {log_path}")
+    summary["tail"] = list(tail)
+    return summary
+
+def report_build_failure(name, capture):
+    print_status(f"Erro na compilação {name} (código {capture['returncode']}), log: {capture['log']}", "error")
+    for diagnostic in [d for d in capture["diagnostics"] if d["severity"] == "error"][:5]:
+        location = f"{diagnostic['file']}:{diagnostic['line']}" if diagnostic["line"] else diagnostic["file"] or name
+        print_status(f"  {location}: {diagnostic['message']}", "error")
+    logging.error(f"Últimas linhas da compilação {name}:\n" + "\n".join(capture["tail"]))
+
+def unused_make_variables(make_command, env):
+    # As variáveis de compilador passadas ao make só valem se o Makefile as
+    # usar; um "make -n -B" mostra os comandos sem executá-los
+    variables = PLATFORM.make_variables()
+    if not variables:
+        return []
+    result = subprocess.run(
+        make_command + ["-n", "-B"] + variables, cwd=OHOOK_COMPILE_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, encoding="utf-8", errors="replace", timeout=60
+    )
+    return [variable for variable in variables if variable.split("=", 1)[1] not in result.stdout]
+
+def make_job_flags(jobs):
+    return [f"-j{jobs}"] if jobs and jobs > 1 else []
+
+def build_target(make_command, arch, target, jobs, env):
+    # Cada arquitetura grava a própria saída, sem intercalar com a outra
+    command = make_command + make_job_flags(jobs) + PLATFORM.make_variables() + [target]
+    capture = run_streamed(command, BUILD_LOGS_DIR / f"build-{arch}.log", arch, cwd=OHOOK_COMPILE_DIR, env=env)
+    logging.info(f"Compilação {arch} ({target}) terminou com código {capture['returncode']}")
+    return capture
+
+def build_targets_parallel(make_command, jobs, env):
+    failures = []
+    with ThreadPoolExecutor(max_workers=len(BUILD_TARGETS), thread_name_prefix="build") as executor:
+        futures = {
+            executor.submit(build_target, make_command, arch, target, jobs, env): arch
+            for arch, target in BUILD_TARGETS.items()
+        }
+        for future in as_completed(futures):
+            arch = futures[future]
+            capture = future.result()
+            if capture["returncode"] != 0:
+                failures.append(arch)
+                report_build_failure(arch, capture)
+    return not failures
+
+def compile_sppc_dll(timestamp_mode=None, parallel=None, jobs=None):
+    timestamp_mode = timestamp_mode or TIMESTAMP_MODE
+    parallel = BUILD_PARALLEL if parallel is None else parallel
+    jobs = jobs or BUILD_JOBS
     try:
         if not OHOOK_COMPILE_DIR.exists():
             print_status(f"Diretório {OHOOK_COMPILE_DIR} não encontrado!", "error")
             return False
         
-        mingw_make = Path("C:\\mingw64\\bin\\mingw32-make.exe")
-        if not mingw_make.exists():
-            print_status(f"Compilador não encontrado: {mingw_make}", "error")
+        make_command = PLATFORM.make_command()
+        if not make_command:
+            print_status("Compilador não encontrado: make/mingw32-make", "error")
             return False
         
-        print_status("Compilando arquivos sppc.dll...", "progress")
+        env = build_environment(timestamp_mode)
         
-        os.chdir(OHOOK_COMPILE_DIR)
+        unused = unused_make_variables(make_command, env)
+        if unused:
+            print_status(f"O Makefile do ohook não usa {', '.join(unused)}: a compilação chamaria outro compilador", "error")
+            print_status(f"Confira os comandos com: make -n -B em {OHOOK_COMPILE_DIR}", "info")
+            return False
         
-        compile_process = subprocess.run(
-            [str(mingw_make)],
-            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            encoding='utf-8', errors='replace'
-        )
+        if parallel:
+            # O total de tarefas é dividido entre os makes de cada arquitetura,
+            # sem ocupar a máquina duas vezes
+            target_jobs = max(1, (jobs or os.cpu_count() or 1) // len(BUILD_TARGETS))
+            print_status(f"Compilando {', '.join(BUILD_TARGETS.values())} em paralelo (-j{target_jobs} cada)...", "progress")
+            if not build_targets_parallel(make_command, target_jobs, env):
+                return False
+        else:
+            print_status("Compilando arquivos sppc.dll...", "progress")
+            capture = run_streamed(
+                make_command + make_job_flags(jobs) + PLATFORM.make_variables(),
+                BUILD_LOGS_DIR / "build.log", "make", cwd=OHOOK_COMPILE_DIR, env=env
+            )
+            if capture["returncode"] != 0:
+                report_build_failure("make", capture)
+                return False
         
         dll32 = OHOOK_COMPILE_DIR / "sppc32.dll"
         dll64 = OHOOK_COMPILE_DIR / "sppc64.dll"
@@ -366,14 +1939,7 @@ def compile_sppc_dll():
                 return False
         else:
             print_status("Os arquivos DLL não foram criados após a compilação", "error")
-            logging.error(f"Saída do compilador: {compile_process.stdout}")
-            logging.error(f"Erros do compilador: {compile_process.stderr}")
             return False
-    except subprocess.CalledProcessError as e:
-        print_status(f"Erro na compilação: {e.stderr}", "error")
-        logging.error(f"Comando que falhou: {e.cmd}")
-        logging.error(f"Código de saída: {e.returncode}")
-        return False
     except Exception as e:
         print_status(f"Erro na compilação: {str(e)}", "error")
         logging.exception("Exceção durante compilação")
@@ -381,9 +1947,11 @@ def compile_sppc_dll():
 
 def verify_checksums():
     results = {}
+    details = {}
     
     for dll_file, expected_hash in EXPECTED_CHECKSUMS.items():
         dll_path = OHOOK_COMPILE_DIR / dll_file
+        actual_hash = None
         if dll_path.exists():
             actual_hash = calculate_sha256(dll_path)
             if actual_hash == expected_hash:
@@ -397,10 +1965,81 @@ def verify_checksums():
         else:
             print_status(f"Arquivo {dll_file} não encontrado!", "error")
             results[dll_file] = False
+        details[dll_file] = {"expected": expected_hash, "actual": actual_hash, "match": results[dll_file]}
+    
+    # Resultado lido pelo daemon e pelo relatório do modo lote
+    try:
+        BUILD_LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        (BUILD_LOGS_DIR / VERIFICATION_FILE).write_text(json.dumps(details, indent=2), encoding="utf-8")
+    except OSError as e:
+        logging.warning(f"Não foi possível gravar {VERIFICATION_FILE}: {e}")
     
     return all(results.values())
 
-def copy_to_output_dir():
+def stage_file(source, destination, mode=None):
+    mode = mode or STAGING_MODE
+    if mode == "link":
+        try:
+            PLATFORM.clone_file(source, destination)
+            return "reflink"
+        except (OSError, ImportError):
+            Path(destination).unlink(missing_ok=True)
+        try:
+            # Seguro porque nem o linker nem normalize_pe_timestamps alteram a DLL
+            # no lugar: ambos substituem o arquivo inteiro
+            os.link(source, destination)
+            return "hardlink"
+        except OSError:
+            pass
+    shutil.copy2(source, destination)
+    return "copy"
+
+def stage_tree(source, destination, mode=None):
+    # A árvore nova é montada ao lado do destino e trocada por renomeação;
+    # no modo "link" a própria árvore de origem é movida quando possível
+    mode = mode or STAGING_MODE
+    source, destination = Path(source), Path(destination)
+    staging = destination.with_name(f".{destination.name}.new")
+    retired = destination.with_name(f".{destination.name}.old")
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.rmtree(retired, ignore_errors=True)
+    
+    method = None
+    if mode == "link":
+        try:
+            os.replace(source, staging)
+            method = "rename"
+        except OSError as e:
+            logging.debug(f"Não foi possível mover {source} para {staging}: {e}")
+    if not method:
+        methods = set()
+        shutil.copytree(source, staging, copy_function=lambda src, dst: methods.add(stage_file(src, dst, mode)))
+        method = "+".join(sorted(methods)) or "copy"
+    
+    if destination.exists():
+        try:
+            os.replace(destination, retired)
+        except OSError:
+            shutil.rmtree(destination)
+    os.replace(staging, destination)
+    shutil.rmtree(retired, ignore_errors=True)
+    logging.info(f"{destination} preparado por {method}")
+    return method
+
+def publish_file(source, destination, mode=None):
+    # Leitores nunca veem uma DLL pela metade: o arquivo completo entra no
+    # lugar do anterior com uma única renomeação
+    destination = Path(destination)
+    temp_file = destination.with_name(f".{destination.name}.{os.getpid()}.tmp")
+    temp_file.unlink(missing_ok=True)
+    try:
+        method = stage_file(source, temp_file, mode)
+        os.replace(temp_file, destination)
+    finally:
+        temp_file.unlink(missing_ok=True)
+    return method
+
+def copy_to_output_dir(mode=None):
     try:
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         
@@ -409,9 +2048,9 @@ def copy_to_output_dir():
             dst_path = OUTPUT_DIR / dll_file
             
             if src_path.exists():
-                shutil.copy2(src_path, dst_path)
+                method = publish_file(src_path, dst_path, mode)
                 if dst_path.exists():
-                    print_status(f"Arquivo {dll_file} copiado para {OUTPUT_DIR}", "success")
+                    print_status(f"Arquivo {dll_file} copiado para {OUTPUT_DIR} ({method})", "success")
                 else:
                     print_status(f"Falha ao copiar {dll_file} para {OUTPUT_DIR}", "error")
                     return False
@@ -427,14 +2066,13 @@ def copy_to_output_dir():
 
 def cleanup_symlinks():
     try:
-        symlinks = ["C:\\mingw64", "C:\\mingw32", "C:\\ohook"]
-        for link in symlinks:
-            if Path(link).exists():
+        toolchain_links = [PLATFORM.toolchain_links[name] for name in managed_toolchains()]
+        for link, _ in compilation_links():
+            if KEEP_TOOLCHAIN_LINKS and link in toolchain_links:
+                continue
+            if is_link(link):
                 print_status(f"Removendo link simbólico {link}...", "progress")
-                subprocess.run(
-                    ["cmd", "/c", f"rmdir {link}"],
-                    check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-                )
+                PLATFORM.remove_link(link)
         return True
     except Exception as e:
         print_status(f"Erro ao remover links simbólicos: {str(e)}", "warning")
@@ -453,101 +2091,887 @@ def cleanup_temp():
         print_status(f"Erro na limpeza: {str(e)}", "warning")
         return False
 
-def main():
-    global keep_date_fixed
+def resource_digest(resource):
+    if resource["sha256"]:
+        return resource["sha256"]
+    with cache_lock:
+        return load_cache_index()["urls"].get(resource["url"])
+
+def artifact_cache_key(timestamp_mode, parallel_build):
+    identity = {
+        "source": resource_digest(RESOURCES["ohook"]),
+        "toolchains": {name: resource_digest(RESOURCES[name]) for name in managed_toolchains()},
+        "host_toolchain": PLATFORM.toolchain_identity(),
+        "make": {"parallel": parallel_build, "targets": BUILD_TARGETS},
+        "timestamp_mode": timestamp_mode
+    }
+    if not identity["source"] or not all(identity["toolchains"].values()):
+        return None
+    if PLATFORM.uses_host_toolchain and not identity["host_toolchain"]:
+        return None
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_artifact_index():
+    try:
+        with open(ARTIFACT_INDEX_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.warning(f"Índice do cache de artefatos inválido, será recriado: {e}")
+        return {}
+
+def save_artifact_index(index):
+    ARTIFACT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_index = ARTIFACT_INDEX_FILE.with_name(ARTIFACT_INDEX_FILE.name + ".tmp")
+    with open(temp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_index, ARTIFACT_INDEX_FILE)
+
+def discard_artifacts(key, index):
+    shutil.rmtree(ARTIFACT_CACHE_DIR / key, ignore_errors=True)
+    index.pop(key, None)
+
+def restore_cached_artifacts(key, destination_dir=None):
+    destination_dir = Path(destination_dir or OHOOK_COMPILE_DIR)
+    entry_dir = ARTIFACT_CACHE_DIR / key
     
-    print("\n" + "="*60)
-    print("COMPILADOR AUTOMATIZADO DE SPPC.DLL (OHOOK 0.5)")
-    print("="*60 + "\n")
+    with cache_lock:
+        index = load_artifact_index()
+        if key not in index or not entry_dir.is_dir():
+            return False
+        
+        # Um acerto só vale se as DLLs ainda corresponderem aos checksums esperados
+        for dll_file, expected_hash in EXPECTED_CHECKSUMS.items():
+            if calculate_sha256(entry_dir / dll_file) != expected_hash:
+                logging.warning(f"Artefato {dll_file} em cache não confere, descartando {key}")
+                discard_artifacts(key, index)
+                save_artifact_index(index)
+                return False
+        
+        # A DLL da compilação pode ser um hardlink da publicada em Output:
+        # gravar por cima dela alteraria a DLL publicada no lugar
+        for dll_file in EXPECTED_CHECKSUMS:
+            publish_file(entry_dir / dll_file, destination_dir / dll_file, "copy")
+        
+        index[key]["last_used"] = time.time()
+        save_artifact_index(index)
     
-    try:
-        initialize_directories()
-        setup_logging()
+    print_status("DLLs obtidas do cache de artefatos", "success")
+    return True
+
+def store_artifacts(key, source_dir=None, max_bytes=ARTIFACT_CACHE_MAX_BYTES):
+    source_dir = Path(source_dir or OHOOK_COMPILE_DIR)
+    entry_dir = ARTIFACT_CACHE_DIR / key
+    temp_dir = ARTIFACT_CACHE_DIR / f"{key}.tmp"
+    
+    with cache_lock:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        temp_dir.mkdir(parents=True)
+        for dll_file in EXPECTED_CHECKSUMS:
+            shutil.copy2(source_dir / dll_file, temp_dir / dll_file)
         
-        logging.info("Iniciando compilação de SPPC.DLL")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(temp_dir, entry_dir)
         
-        if not check_admin():
-            print_status("Este script precisa ser executado como administrador", "error")
-            print_status("Por favor, feche e execute novamente como administrador", "info")
+        index = load_artifact_index()
+        index[key] = {
+            "size": sum(path.stat().st_size for path in entry_dir.iterdir()),
+            "last_used": time.time()
+        }
+        for victim in lru_victims(index, max_bytes):
+            discard_artifacts(victim, index)
+            logging.info(f"Removido do cache de artefatos: {victim}")
+        save_artifact_index(index)
+    
+    logging.info(f"DLLs armazenadas no cache de artefatos: {key}")
+
+def safe_relative_path(relative_path):
+    # Conferido com as regras do Windows e do POSIX: "\\Windows\\x.dll" não é
+    # absoluto para o Windows, mas tem raiz e sairia do diretório de destino
+    for path in (PureWindowsPath(relative_path), PurePosixPath(relative_path)):
+        if path.drive or path.root or ".." in path.parts or not path.parts:
             return False
-        
-        seven_zip_path = locate_7zip()
-        if not seven_zip_path:
-            print_status("7-Zip não encontrado no sistema", "error")
-            print_status("Por favor, instale o 7-Zip e execute o script novamente", "info")
-            print_status("Download disponível em: https://www.7-zip.org/download.html", "info")
+    return True
+
+def safe_bundle_name(value):
+    # Nomes vindos do manifesto viram componentes de caminho: um único nível, sem "." nem ".."
+    return isinstance(value, str) and re.fullmatch(r"[\w.-]+", value) is not None and value not in (".", "..")
+
+def inside_directory(path, directory):
+    return os.path.realpath(path).startswith(os.path.realpath(directory) + os.sep)
+
+def inside_store(path):
+    return inside_directory(path, TOOLCHAIN_STORE_DIR)
+
+def validate_bundle_manifest(manifest):
+    for name, entry in manifest["resources"].items():
+        if name not in RESOURCES:
+            raise ValueError(f"recurso desconhecido no pacote: {name}")
+        if not re.fullmatch(r"[0-9a-f]{64}", str(entry["sha256"])):
+            raise ValueError(f"SHA-256 inválido para {name} no pacote")
+        if entry["object"] not in (None, f"objects/{entry['sha256']}"):
+            raise ValueError(f"objeto inválido para {name} no pacote: {entry['object']}")
+    for name, toolchain in manifest["toolchains"].items():
+        if name not in TOOLCHAINS:
+            raise ValueError(f"toolchain desconhecido no pacote: {name}")
+        if toolchain["root"] != TOOLCHAINS[name]["root"] or not safe_bundle_name(toolchain["version"]):
+            raise ValueError(f"versão ou diretório inválido para o toolchain {name} no pacote")
+        for relative_path, (_, digest) in toolchain["files"].items():
+            if not safe_relative_path(relative_path) or not re.fullmatch(r"[0-9a-f]{64}", str(digest)):
+                raise ValueError(f"caminho ou hash inválido no pacote: {relative_path}")
+
+def export_bundle(bundle_path, compression=BUNDLE_COMPRESSION):
+    # Reúne o que um builder sem rede precisa: o código-fonte verificado (objeto
+    # do cache) e o subconjunto extraído de cada toolchain, com os hashes
+    bundle_path = Path(bundle_path)
+    manifest = {"format": BUNDLE_FORMAT, "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "resources": {}, "toolchains": {}}
+    members = []
+    
+    for name, resource in required_resources().items():
+        digest = resource_digest(resource)
+        if not digest:
+            print_status(f"Recurso {name} ainda não foi obtido; execute um build antes de exportar", "error")
             return False
+        entry = {"url": resource["url"], "sha256": digest, "object": None}
         
-        logging.info(f"7-Zip encontrado: {seven_zip_path}")
-        
-        # Download de recursos
-        downloads = {}
-        for name, url in RESOURCES.items():
-            file_name = os.path.basename(url)
-            downloads[name] = TEMP_DIR / file_name
-            if not download_file(url, downloads[name]):
+        if name in TOOLCHAINS:
+            toolchain_dir = installed_toolchain_dir(name)
+            if not toolchain_dir:
+                print_status(f"Toolchain {name} não está no store; execute um build antes de exportar", "error")
                 return False
+            problems = verify_toolchain_integrity(toolchain_dir)
+            if problems is None:
+                build_integrity_index(toolchain_dir)
+            elif problems:
+                print_status(f"Toolchain {name} danificado, exportação cancelada: {problems[0]}", "error")
+                return False
+            
+            version = toolchain_dir.parent.name
+            prefix = f"toolchains/{version}/{TOOLCHAINS[name]['root']}"
+            files = {
+                relative_path: [size, digest]
+                for relative_path, (size, _, digest) in load_integrity_index(toolchain_dir).items()
+            }
+            manifest_file = toolchain_dir / TOOLCHAIN_MANIFEST_FILE
+            files[TOOLCHAIN_MANIFEST_FILE] = [manifest_file.stat().st_size, hash_file(manifest_file)]
+            manifest["toolchains"][name] = {"version": version, "root": TOOLCHAINS[name]["root"], "files": files}
+            members.extend((f"{prefix}/{relative_path}", toolchain_dir / relative_path) for relative_path in sorted(files))
+        else:
+            cached = cache_lookup(digest)
+            if not cached:
+                print_status(f"Recurso {name} não está no cache; execute um build antes de exportar", "error")
+                return False
+            entry["object"] = f"objects/{digest}"
+            members.append((entry["object"], cached))
+        manifest["resources"][name] = entry
+    
+    temp_bundle = bundle_path.with_name(f"{bundle_path.name}.tmp")
+    with timed(f"export {bundle_path.name}", "bundle") as record:
+        with tarfile.open(temp_bundle, f"w|{compression}") as bundle:
+            data = json.dumps(manifest, indent=2).encode("utf-8")
+            info = tarfile.TarInfo(BUNDLE_MANIFEST)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            bundle.addfile(info, io.BytesIO(data))
+            for arcname, path in members:
+                bundle.add(str(path), arcname=arcname, recursive=False)
+        os.replace(temp_bundle, bundle_path)
+        record["bytes"] = bundle_path.stat().st_size
+    
+    print_status(f"Pacote offline gravado em {bundle_path} ({len(members)} arquivos, {record['bytes'] / 1024 ** 2:.1f} MB)", "success")
+    return True
+
+def write_bundle_member(source, destination, buffer_size=DOWNLOAD_BUFFER_SIZE):
+    # Grava e calcula o hash na mesma passada
+    digest = hashlib.sha256()
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    with open(destination, "wb") as f:
+        for block in iter(lambda: source.read(buffer_size), b""):
+            digest.update(block)
+            f.write(block)
+    return digest.hexdigest()
+
+def finish_bundle_toolchain(name, toolchain, staging_dir, received):
+    # Publica no store a versão recebida, com o índice de integridade montado
+    # a partir dos hashes calculados durante a importação
+    missing = [relative_path for relative_path in toolchain["files"] if relative_path not in received]
+    if missing:
+        raise ValueError(f"toolchain {toolchain['version']} incompleto no pacote: {missing[0]}")
+    
+    toolchain_dir = staging_dir / toolchain["root"]
+    entries = {}
+    for relative_path, digest in received.items():
+        if relative_path != TOOLCHAIN_MANIFEST_FILE:
+            stat = (toolchain_dir / relative_path).stat()
+            entries[relative_path] = [stat.st_size, stat.st_mtime_ns, digest]
+    save_integrity_index(toolchain_dir, entries)
+    
+    version_dir = TOOLCHAIN_STORE_DIR / toolchain["version"]
+    if not inside_store(staging_dir) or not inside_store(version_dir):
+        raise ValueError(f"toolchain {toolchain['version']} fora do store")
+    with ProcessLock(TOOLCHAIN_STORE_DIR / f".{name}.lock"):
+        existing = version_dir / toolchain["root"]
+        if load_toolchain_manifest(existing) and verify_toolchain_integrity(existing) == []:
+            # A versão já estava no store e íntegra
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return
+        if version_dir.exists():
+            shutil.rmtree(version_dir)
+        os.replace(staging_dir, version_dir)
+    logging.info(f"Toolchain {toolchain['version']} importado: {len(entries)} arquivos")
+
+def import_bundle(bundle_path):
+    # Uma única leitura sequencial do pacote (tar em modo stream), gravando
+    # cada arquivo direto no cache ou no store de toolchains
+    bundle_path = Path(bundle_path)
+    manifest = None
+    expected = {}
+    staging = {}
+    received = {}
+    
+    try:
+        with timed(f"import {bundle_path.name}", "bundle") as record, tarfile.open(bundle_path, "r|*") as bundle:
+            for member in bundle:
+                if manifest is None:
+                    if member.name != BUNDLE_MANIFEST:
+                        raise ValueError(f"o pacote deve começar por {BUNDLE_MANIFEST}")
+                    manifest = json.load(bundle.extractfile(member))
+                    if manifest.get("format") != BUNDLE_FORMAT:
+                        raise ValueError(f"formato de pacote não suportado: {manifest.get('format')}")
+                    validate_bundle_manifest(manifest)
+                    
+                    with cache_lock:
+                        pins = load_cache_index()["urls"]
+                    for name, entry in manifest["resources"].items():
+                        pinned = RESOURCES[name]["sha256"] or pins.get(entry["url"])
+                        if pinned and pinned != entry["sha256"]:
+                            raise ValueError(f"{name} no pacote não confere com o checksum fixado")
+                        if entry["object"]:
+                            expected[entry["object"]] = ("object", entry["sha256"], None)
+                    for name, toolchain in manifest["toolchains"].items():
+                        for relative_path, (_, digest) in toolchain["files"].items():
+                            expected[f"toolchains/{toolchain['version']}/{toolchain['root']}/{relative_path}"] = (name, digest, relative_path)
+                    continue
+                
+                if not member.isfile():
+                    continue
+                if member.name not in expected:
+                    logging.warning(f"Ignorando arquivo inesperado no pacote: {member.name}")
+                    continue
+                
+                kind, digest, relative_path = expected.pop(member.name)
+                if kind == "object":
+                    destination = DOWNLOAD_CACHE_DIR / f".import-{digest}-{os.getpid()}"
+                else:
+                    toolchain = manifest["toolchains"][kind]
+                    if kind not in staging:
+                        staging[kind] = TOOLCHAIN_STORE_DIR / f".tmp-{toolchain['version']}-{os.getpid()}"
+                        if not inside_store(staging[kind]):
+                            raise ValueError(f"toolchain {toolchain['version']} fora do store")
+                        shutil.rmtree(staging[kind], ignore_errors=True)
+                        received[kind] = {}
+                    destination = staging[kind] / toolchain["root"] / relative_path
+                    if not inside_directory(destination, staging[kind]):
+                        raise ValueError(f"caminho fora do toolchain no pacote: {relative_path}")
+                
+                if write_bundle_member(bundle.extractfile(member), destination) != digest:
+                    destination.unlink(missing_ok=True)
+                    raise ValueError(f"{member.name}: SHA-256 não confere")
+                record["bytes"] = record.get("bytes", 0) + member.size
+                
+                if kind == "object":
+                    cached = cache_object_path(digest)
+                    cached.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(destination, cached)
+                else:
+                    received[kind][relative_path] = digest
+            
+            if manifest is None:
+                raise ValueError("pacote vazio")
+            if expected:
+                raise ValueError(f"{len(expected)} arquivo(s) do manifesto ausentes no pacote, por exemplo {next(iter(expected))}")
+            
+            for name, staging_dir in staging.items():
+                finish_bundle_toolchain(name, manifest["toolchains"][name], staging_dir, received[name])
+    except (OSError, ValueError, KeyError, TypeError, tarfile.TarError) as e:
+        print_status(f"Erro ao importar {bundle_path}: {e}", "error")
+        for staging_dir in staging.values():
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        return False
+    
+    # Os recursos passam a ser resolvidos pelo cache, sem acesso à rede
+    with cache_lock:
+        index = load_cache_index()
+        for entry in manifest["resources"].values():
+            index["urls"].setdefault(entry["url"], entry["sha256"])
+            cached = cache_object_path(entry["sha256"])
+            if entry["object"] and cached.exists():
+                index["objects"][entry["sha256"]] = {
+                    "size": cached.stat().st_size,
+                    "name": os.path.basename(entry["url"]),
+                    "last_used": time.time()
+                }
+        save_cache_index(index)
+    
+    print_status(f"Pacote {bundle_path.name} importado: {len(manifest['resources'])} recursos, {len(manifest['toolchains'])} toolchain(s)", "success")
+    return True
+
+class Stage:
+    def __init__(self, name, run, inputs=None, outputs=None, always_run=False, measure=None, exclusive=False):
+        self.name = name
+        self.run = run
+        self.inputs = inputs or (lambda ctx: [])
+        self.outputs = outputs or (lambda ctx: [])
+        self.always_run = always_run
+        # Usa caminhos fixos compartilhados entre workspaces
+        self.exclusive = exclusive
+        # Bytes movidos pela etapa (por padrão, o tamanho das saídas)
+        self.measure = measure or (lambda ctx: path_size(self.outputs(ctx)))
+
+def stamp_path(stage_name):
+    return STAMPS_DIR / f"{stage_name}.json"
+
+def load_stamp(stage_name):
+    try:
+        with open(stamp_path(stage_name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Carimbo inválido para a etapa {stage_name}: {e}")
+        return None
+
+def write_stamp(stage_name, inputs):
+    STAMPS_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = {"inputs": inputs, "finished": datetime.now().isoformat(timespec="seconds")}
+    temp_stamp = stamp_path(stage_name).with_suffix(".tmp")
+    with open(temp_stamp, "w", encoding="utf-8") as f:
+        json.dump(stamp, f, indent=2)
+    os.replace(temp_stamp, stamp_path(stage_name))
+
+def invalidate_stamp(stage_name):
+    stamp_path(stage_name).unlink(missing_ok=True)
+
+def tree_digest(directory):
+    digest = hashlib.sha256()
+    for path in sorted(Path(directory).rglob("*")):
+        if path.is_file():
+            digest.update(path.relative_to(directory).as_posix().encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def fingerprint_inputs(items, previous=None):
+    # Arquivos são identificados pelo SHA-256 do conteúdo; o hash anterior é
+    # reaproveitado quando tamanho e data de modificação não mudaram
+    previous = previous or {}
+    fingerprints = {}
+    
+    for item in items:
+        if not isinstance(item, Path):
+            fingerprints[f"value:{item}"] = str(item)
+            continue
         
-        # Extração do ohook para o diretório temporário
-        ohook_temp_dir = TEMP_DIR / "ohook-extract"
-        ohook_temp_dir.mkdir(parents=True, exist_ok=True)
-        
-        if not extract_archive(downloads["ohook"], ohook_temp_dir, seven_zip_path):
+        key = str(item)
+        if item.is_file():
+            stat = item.stat()
+            cached = previous.get(key)
+            if isinstance(cached, list) and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+                fingerprints[key] = cached
+            else:
+                fingerprints[key] = [stat.st_size, stat.st_mtime_ns, calculate_sha256(item)]
+        elif item.is_dir():
+            fingerprints[key] = tree_digest(item)
+        else:
+            fingerprints[key] = "missing"
+    
+    return fingerprints
+
+def same_fingerprints(current, recorded):
+    if recorded is None or current.keys() != recorded.keys():
+        return False
+    for key, value in current.items():
+        # Para arquivos compara-se apenas o hash do conteúdo
+        if isinstance(value, list) and isinstance(recorded[key], list):
+            if value[2] != recorded[key][2]:
+                return False
+        elif value != recorded[key]:
             return False
+    return True
+
+def stage_up_to_date(stage, ctx):
+    stamp = load_stamp(stage.name)
+    if stamp is None:
+        return False
+    
+    if not all(Path(output).exists() for output in stage.outputs(ctx)):
+        return False
+    inputs = fingerprint_inputs(stage.inputs(ctx), stamp.get("inputs"))
+    return same_fingerprints(inputs, stamp.get("inputs"))
+
+def run_pipeline(stages, ctx, from_stage=None, only_stage=None, force=False):
+    names = [stage.name for stage in stages]
+    selected = stages
+    if only_stage:
+        selected = [stages[names.index(only_stage)]]
+    elif from_stage:
+        selected = stages[names.index(from_stage):]
+    
+    # Etapas sempre executadas que vêm antes da seleção (links, conferência dos
+    # toolchains) são pré-requisitos: a limpeza do build anterior já desfez os
+    # links, então "--from-stage compile" falharia sem elas
+    first = names.index(selected[0].name)
+    selected = [stage for stage in stages[:first] if stage.always_run] + selected
+    
+    with contextlib.ExitStack() as locks:
+        locked = False
+        for stage in selected:
+            # A partir da primeira etapa exclusiva, o build segura a trava até o fim
+            if stage.exclusive and PLATFORM.compile_dir and not locked:
+                with timed("wait build lock", "lock"):
+                    locks.enter_context(build_lock)
+                locked = True
+            if not run_stage(stage, ctx, force or stage.name in (from_stage, only_stage)):
+                return False
+    
+    return True
+
+def run_stage(stage, ctx, forced):
+    with timed(stage.name) as record:
+        if not stage.always_run and not forced:
+            if stage_up_to_date(stage, ctx):
+                print_status(f"Etapa {stage.name}: sem alterações, pulando", "info")
+                record["skipped"] = True
+                return True
         
-        # Copiar os arquivos extraídos para o diretório de código-fonte
-        ohook_extracted = ohook_temp_dir / "ohook-0.5"
-        if not ohook_extracted.exists():
-            print_status("Diretório do ohook não encontrado após extração", "error")
-            return False
+        logging.info(f"Executando etapa {stage.name}")
+        invalidate_stamp(stage.name)
+        inputs = fingerprint_inputs(stage.inputs(ctx))
         
-        try:
-            if SOURCE_DIR.exists():
-                shutil.rmtree(SOURCE_DIR)
-            shutil.copytree(ohook_extracted, SOURCE_DIR)
-        except Exception as e:
-            print_status(f"Erro ao copiar arquivos para {SOURCE_DIR}: {str(e)}", "error")
+        if not stage.run(ctx):
+            print_status(f"Etapa {stage.name} falhou", "error")
             return False
+        record["bytes"] = stage.measure(ctx)
         
-        # Extrair compiladores para diretórios apropriados
-        if not extract_archive(downloads["mingw32"], MINGW32_DIR.parent, seven_zip_path):
-            return False
+        if not stage.always_run:
+            write_stamp(stage.name, inputs)
+    
+    return True
+
+def overlap_extraction_jobs(ctx):
+    # Extração disparada pelo fim do download de cada recurso
+    jobs = {name: (extract_toolchain, (name, ctx["downloads"][name], ctx["seven_zip_path"])) for name in managed_toolchains()}
+    jobs["ohook"] = (stage_extract_source, (ctx,))
+    return jobs
+
+def stage_download(ctx):
+    if not ctx.get("overlap_extraction"):
+        return fetch_all_resources(pending_resources()) is not None
+    
+    jobs = overlap_extraction_jobs(ctx)
+    cancel_event = threading.Event()
+    futures = []
+    
+    def stop_on_failure(future):
+        if future.exception() or not future.result():
+            cancel_event.set()
+    
+    resources = pending_resources()
+    with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="extract") as executor:
+        def start_extraction(name, archive):
+            function, args = jobs[name]
+            future = executor.submit(function, *args)
+            future.add_done_callback(stop_on_failure)
+            futures.append(future)
         
-        if not extract_archive(downloads["mingw64"], MINGW64_DIR.parent, seven_zip_path):
+        # Toolchains já no store só precisam dos links, sem esperar por download
+        for name in jobs:
+            if name not in resources:
+                start_extraction(name, None)
+        downloads = fetch_all_resources(resources, on_fetched=start_extraction, cancel_event=cancel_event)
+    
+    if downloads is None:
+        return False
+    for future in futures:
+        if future.exception():
+            logging.error(f"Exceção na extração: {future.exception()}")
             return False
-        
-        # Configurar ambiente de compilação (links simbólicos)
-        if not setup_compilation_environment():
+        if not future.result():
             return False
+    
+    # As etapas de extração já foram feitas aqui; os carimbos evitam que rodem de novo
+    for stage in build_stages():
+        if stage.name in ("extract-toolchains", "extract-source"):
+            write_stamp(stage.name, fingerprint_inputs(stage.inputs(ctx)))
+    return True
+
+def stage_extract_toolchains(ctx):
+    jobs = [
+        (extract_toolchain, (name, ctx["downloads"][name], ctx["seven_zip_path"]))
+        for name in managed_toolchains()
+    ]
+    if not jobs:
+        logging.info("Toolchain fornecido pelo sistema, nada a extrair")
+        return True
+    return extract_archives_parallel(jobs)
+
+def toolchain_problems(toolchain_dir):
+    if not load_toolchain_manifest(toolchain_dir):
+        return ["toolchain não extraído"]
+    problems = verify_toolchain_integrity(toolchain_dir)
+    if problems is None:
+        build_integrity_index(toolchain_dir)
+        return []
+    return problems
+
+def verify_installed_toolchains():
+    # Conferência feita uma vez pelo daemon; os jobs recebem o resultado
+    verified = set()
+    for name in managed_toolchains():
+        toolchain_dir = installed_toolchain_dir(name)
+        if toolchain_dir and not toolchain_problems(toolchain_dir):
+            verified.add(os.path.realpath(toolchain_dir))
+    return verified
+
+def stage_check_toolchains(ctx):
+    # Um arquivo apagado ou alterado no toolchain é detectado aqui, antes de
+    # virar um erro obscuro de compilação, e a versão é extraída de novo.
+    # Jobs do daemon pulam as versões que o daemon já conferiu
+    verified = ctx.get("verified_toolchains") or set()
+    checked = []
+    for name in managed_toolchains():
+        toolchain_dir = active_toolchain_dir(name)
+        if os.path.realpath(toolchain_dir) in verified and load_toolchain_manifest(toolchain_dir):
+            logging.debug(f"Toolchain {name} já conferido pelo daemon: {toolchain_dir}")
+            checked.append(os.path.realpath(toolchain_dir))
+            continue
         
+        problems = toolchain_problems(toolchain_dir)
+        if problems:
+            print_status(f"Toolchain {name} danificado: {len(problems)} problema(s), extraindo novamente", "warning")
+            for problem in problems[:20]:
+                logging.warning(f"  {name}: {problem}")
+            # O pacote pode não estar em Temp: toolchains já no store não são
+            # baixados de novo e a limpeza apaga Temp ao fim de cada build
+            archive = ctx["downloads"][name]
+            if not archive.exists():
+                archive.parent.mkdir(parents=True, exist_ok=True)
+                if not fetch_resource(RESOURCES[name], archive):
+                    print_status(f"Não foi possível obter o pacote de {name} para reparar o toolchain", "error")
+                    return False
+            if not extract_toolchain(name, archive, ctx["seven_zip_path"]):
+                return False
+        checked.append(os.path.realpath(active_toolchain_dir(name)))
+    
+    try:
+        BUILD_LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        (BUILD_LOGS_DIR / VERIFIED_TOOLCHAINS_FILE).write_text(json.dumps(checked, indent=2), encoding="utf-8")
+    except OSError as e:
+        logging.warning(f"Não foi possível gravar {VERIFIED_TOOLCHAINS_FILE}: {e}")
+    return True
+
+def stage_extract_source(ctx):
+    ctx["ohook_extract_dir"].mkdir(parents=True, exist_ok=True)
+    if not extract_archive(ctx["downloads"]["ohook"], ctx["ohook_extract_dir"], ctx["seven_zip_path"]):
+        return False
+    
+    if not ctx["ohook_extracted"].exists():
+        print_status("Diretório do ohook não encontrado após extração", "error")
+        return False
+    return True
+
+def stage_source(ctx):
+    # Mover (ou copiar) os arquivos extraídos para o diretório de código-fonte
+    try:
+        if not ctx["ohook_extracted"].exists() and not stage_extract_source(ctx):
+            return False
+        stage_tree(ctx["ohook_extracted"], SOURCE_DIR, ctx["staging_mode"])
+        return True
+    except Exception as e:
+        print_status(f"Erro ao copiar arquivos para {SOURCE_DIR}: {str(e)}", "error")
+        return False
+
+def stage_compile(ctx):
+    timestamp_mode = ctx["timestamp_mode"]
+    
+    if ctx["artifact_cache"]:
+        ctx["artifact_key"] = artifact_cache_key(timestamp_mode, ctx["parallel_build"])
+        if ctx["artifact_key"] and restore_cached_artifacts(ctx["artifact_key"]):
+            ctx["artifact_hit"] = True
+            return True
+    
+    if timestamp_mode == "deterministic":
+        # Sem alterar o relógio: a data vem do ambiente e dos cabeçalhos PE
+        compile_success = compile_sppc_dll(timestamp_mode, ctx["parallel_build"], ctx["build_jobs"])
+        if compile_success:
+            try:
+                for dll_file in EXPECTED_CHECKSUMS:
+                    normalize_pe_timestamps(OHOOK_COMPILE_DIR / dll_file, BUILD_TIMESTAMP)
+            except Exception as e:
+                print_status(f"Erro ao normalizar cabeçalhos PE: {str(e)}", "error")
+                return False
+    else:
         # Configurar timezone e data fixa
-        success = set_timezone_and_fixed_time()
-        if not success:
+        if not set_timezone_and_fixed_time():
             print_status("Falha ao configurar data e hora", "error")
             return False
         
-        # Processo de compilação
         try:
-            compile_success = compile_sppc_dll()
+            compile_success = compile_sppc_dll(timestamp_mode, ctx["parallel_build"], ctx["build_jobs"])
         finally:
             restore_time()
+    
+    if not compile_success:
+        print_status("A compilação falhou", "error")
+    return compile_success
+
+def stage_verify(ctx):
+    if not verify_checksums():
+        print_status("A verificação dos checksums falhou! Os arquivos compilados não são idênticos aos esperados.", "error")
+        return False
+    
+    # Só DLLs verificadas entram no cache de artefatos
+    if ctx.get("artifact_key") and not ctx.get("artifact_hit"):
+        store_artifacts(ctx["artifact_key"])
+    return True
+
+def stage_cleanup(ctx):
+    cleanup_symlinks()
+    cleanup_temp()
+    return True
+
+def extracted_toolchain_bytes(ctx):
+    total = 0
+    for name in managed_toolchains():
+        manifest = load_toolchain_manifest(active_toolchain_dir(name))
+        total += sum(manifest["files"].values()) if manifest else 0
+    return total
+
+def build_stages():
+    dlls = lambda ctx: [OHOOK_COMPILE_DIR / dll_file for dll_file in EXPECTED_CHECKSUMS]
+    toolchain_manifests = lambda ctx: [active_toolchain_dir(name) / TOOLCHAIN_MANIFEST_FILE for name in managed_toolchains()]
+    
+    return [
+        Stage("download", stage_download,
+              inputs=lambda ctx: [f"{resource['url']}#{resource['sha256']}" for resource in pending_resources().values()],
+              outputs=lambda ctx: [ctx["downloads"][name] for name in pending_resources()]),
+        Stage("extract-toolchains", stage_extract_toolchains,
+              inputs=lambda ctx: [ctx["downloads"][name] for name in managed_toolchains()] + [SELECTIVE_EXTRACTION] + TOOLCHAIN_PATTERNS,
+              outputs=toolchain_manifests,
+              measure=extracted_toolchain_bytes),
+        Stage("check-toolchains", stage_check_toolchains, always_run=True),
+        Stage("extract-source", stage_extract_source,
+              inputs=lambda ctx: [ctx["downloads"]["ohook"]],
+              outputs=lambda ctx: [ctx["ohook_extracted"]]),
+        Stage("source", stage_source,
+              inputs=lambda ctx: [ctx["downloads"]["ohook"]],
+              outputs=lambda ctx: [SOURCE_DIR]),
+        Stage("link", lambda ctx: setup_compilation_environment(), always_run=True, exclusive=True),
+        Stage("compile", stage_compile,
+              inputs=lambda ctx: [ctx["downloads"]["ohook"], ctx["timestamp_mode"], ctx["parallel_build"], PLATFORM.name] + toolchain_manifests(ctx),
+              outputs=dlls,
+              exclusive=True),
+        Stage("verify", stage_verify,
+              inputs=lambda ctx: dlls(ctx) + list(EXPECTED_CHECKSUMS.values()),
+              measure=lambda ctx: path_size(dlls(ctx)),
+              exclusive=True),
+        Stage("publish", lambda ctx: copy_to_output_dir(ctx["staging_mode"]),
+              inputs=dlls,
+              outputs=lambda ctx: [OUTPUT_DIR / dll_file for dll_file in EXPECTED_CHECKSUMS],
+              exclusive=True),
+        Stage("cleanup", stage_cleanup, always_run=True, exclusive=True)
+    ]
+
+STAGE_NAMES = [stage.name for stage in build_stages()]
+
+def mirror_argument(value):
+    name, separator, source = value.partition("=")
+    if not separator or name not in RESOURCES or not source:
+        raise argparse.ArgumentTypeError(f"use RECURSO=FONTE, com RECURSO em {', '.join(RESOURCES)}")
+    return name, source
+
+def parse_arguments(argv=None):
+    # Sem abreviações: "--mirro" ou "--work" passariam pela lista de opções reservadas do daemon
+    parser = argparse.ArgumentParser(description="Compilador automatizado de SPPC.DLL (ohook)", allow_abbrev=False)
+    parser.add_argument("--from-stage", choices=STAGE_NAMES,
+                        help="executa a partir desta etapa, assumindo as anteriores concluídas")
+    parser.add_argument("--only-stage", choices=STAGE_NAMES,
+                        help="executa somente esta etapa")
+    parser.add_argument("--force", action="store_true",
+                        help="ignora os carimbos e executa todas as etapas selecionadas")
+    parser.add_argument("--timestamp-mode", choices=TIMESTAMP_MODES, default=TIMESTAMP_MODE,
+                        help="clock: mantém o relógio do sistema na data fixa; "
+                             "deterministic: injeta a data sem alterar o relógio")
+    parser.add_argument("--parallel-build", action="store_true", default=BUILD_PARALLEL,
+                        help="compila as DLLs de 32 e 64 bits ao mesmo tempo, com logs separados")
+    parser.add_argument("--jobs", type=int, default=BUILD_JOBS,
+                        help="total de tarefas simultâneas do make (-j); padrão: nenhum -j na compilação "
+                             "sequencial e os núcleos divididos entre as arquiteturas com --parallel-build")
+    parser.add_argument("--no-artifact-cache", dest="artifact_cache", action="store_false",
+                        help="sempre compila, sem consultar o cache de DLLs")
+    parser.add_argument("--mirror", dest="mirrors", metavar="RECURSO=FONTE", type=mirror_argument, action="append", default=[],
+                        help="fonte adicional (URL, file:// ou caminho local) para um recurso; pode ser repetido")
+    parser.add_argument("--no-overlap", dest="overlap_extraction", action="store_false", default=OVERLAP_EXTRACTION,
+                        help="só extrai depois que todos os downloads terminarem")
+    parser.add_argument("--staging-mode", choices=STAGING_MODES, default=STAGING_MODE,
+                        help="link: move/clona/cria hardlinks quando possível; copy: sempre copia")
+    parser.add_argument("--trace", metavar="ARQUIVO",
+                        help="caminho do trace de tempos (padrão: Logs/trace-<data>.json)")
+    parser.add_argument("--workspace", metavar="NOME",
+                        help="usa Workspaces/NOME para código-fonte, temporários, saída, carimbos e logs")
+    parser.add_argument("--no-pause", dest="pause", action="store_false",
+                        help="não espera Enter ao terminar")
+    parser.add_argument("--export-bundle", metavar="ARQUIVO",
+                        help="grava um pacote offline com o código-fonte e os toolchains já verificados")
+    parser.add_argument("--import-bundle", metavar="ARQUIVO",
+                        help="instala um pacote offline no cache e no store de toolchains")
+    parser.add_argument("--batch", metavar="MANIFESTO",
+                        help="compila todas as combinações de versões de um manifesto JSON e grava um relatório consolidado")
+    parser.add_argument("--config", metavar="ARQUIVO",
+                        help="aplica os recursos e checksums de uma entrada de manifesto (JSON) a este build")
+    parser.add_argument("--daemon-state", metavar="ARQUIVO", help=argparse.SUPPRESS)
+    parser.add_argument("--daemon", action="store_true",
+                        help="inicia a API local de builds em vez de compilar uma vez")
+    parser.add_argument("--host", default=DAEMON_HOST, help="endereço da API do daemon")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help="porta da API do daemon")
+    parser.add_argument("--concurrency", type=int,
+                        help=f"número de jobs executados ao mesmo tempo pelo daemon ou pelo modo lote (padrão: {DAEMON_CONCURRENCY})")
+    return parser.parse_args(argv)
+
+def normalize_batch_entry(entry, index=1):
+    # Completa a entrada com os recursos e checksums padrão; erros no manifesto
+    # aparecem aqui, antes de qualquer download
+    if not isinstance(entry, dict):
+        raise ValueError(f"entrada {index}: esperado um objeto JSON")
+    name = str(entry.get("name") or f"entrada-{index}")
+    if not re.fullmatch(r"[\w.-]+", name):
+        raise ValueError(f"{name}: o nome aceita apenas letras, números, '.', '_' e '-'")
+    unknown = set(entry) - {"name", "resources", "checksums", "args"}
+    if unknown:
+        raise ValueError(f"{name}: chaves desconhecidas: {', '.join(sorted(unknown))}")
+    
+    overrides = entry.get("resources") or {}
+    unknown = set(overrides) - set(RESOURCES)
+    if unknown:
+        raise ValueError(f"{name}: recursos desconhecidos: {', '.join(sorted(unknown))}")
+    resources = {}
+    for resource_name, default in RESOURCES.items():
+        override = overrides.get(resource_name) or {}
+        if not isinstance(override, dict):
+            raise ValueError(f"{name}: {resource_name} deve ser um objeto JSON")
+        unknown = set(override) - set(default)
+        if unknown:
+            raise ValueError(f"{name}: chaves desconhecidas em {resource_name}: {', '.join(sorted(unknown))}")
+        if resource_name == "ohook" and "url" in override and "root" not in override:
+            raise ValueError(f"{name}: informe \"root\" (diretório criado ao extrair) junto da url do ohook")
+        resource = dict(default, mirrors=list(default["mirrors"]))
+        resource.update(override)
+        resources[resource_name] = resource
+    
+    checksums = entry.get("checksums") or dict(EXPECTED_CHECKSUMS)
+    if set(checksums) != set(BUILD_TARGETS.values()):
+        raise ValueError(f"{name}: \"checksums\" deve ter exatamente {', '.join(BUILD_TARGETS.values())}")
+    return {"name": name, "resources": resources, "checksums": checksums, "args": [str(arg) for arg in entry.get("args", [])]}
+
+def apply_build_config(config_path):
+    # Uma entrada do modo lote substitui recursos e checksums só neste processo
+    global TOOLCHAIN_STORE_KEEP
+    try:
+        config = json.loads(Path(config_path).read_text(encoding="utf-8"))
+        keep = config.pop("toolchain_store_keep", None) if isinstance(config, dict) else None
+        entry = normalize_batch_entry(config)
+    except (OSError, ValueError) as e:
+        print_status(f"Configuração inválida em {config_path}: {e}", "error")
+        return False
+    
+    RESOURCES.update(entry["resources"])
+    EXPECTED_CHECKSUMS.clear()
+    EXPECTED_CHECKSUMS.update(entry["checksums"])
+    if keep:
+        # Versões usadas por outras entradas do lote não podem ser removidas
+        TOOLCHAIN_STORE_KEEP = max(TOOLCHAIN_STORE_KEEP, keep)
+    logging.info(f"Configuração {entry['name']} aplicada: " + ", ".join(f"{name}={resource['url']}" for name, resource in RESOURCES.items()))
+    return True
+
+def load_daemon_state(state_path):
+    with open(state_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main(args=None):
+    global keep_date_fixed
+    args = args or parse_arguments([])
+    if args.workspace:
+        use_workspace(args.workspace)
+    
+    print("\n" + "="*60)
+    print("COMPILADOR AUTOMATIZADO DE SPPC.DLL (OHOOK 0.5)")
+    print("="*60 + "\n")
+    
+    try:
+        # O logging vem antes de tudo: um registro emitido sem handlers faria o
+        # módulo logging instalar o próprio handler de console (basicConfig)
+        setup_logging()
+        initialize_directories()
+        install_subprocess_counter()
+        
+        logging.info("Iniciando compilação de SPPC.DLL")
+        
+        # Jobs do daemon herdam as verificações feitas na inicialização dele
+        daemon_state = load_daemon_state(args.daemon_state) if args.daemon_state else None
         
-        if not compile_success:
-            print_status("A compilação falhou", "error")
+        if not daemon_state and not check_admin():
+            print_status("Este script precisa ser executado como administrador", "error")
+            print_status("Por favor, feche e execute novamente como administrador", "info")
             return False
         
-        # Verificar checksums
-        if not verify_checksums():
-            print_status("A verificação dos checksums falhou! Os arquivos compilados não são idênticos aos esperados.", "error")
+        # Só os toolchains (.7z) exigem o 7-Zip; o código-fonte (.zip) é extraído
+        # pelo próprio Python, então com o toolchain do sistema ele é opcional
+        seven_zip_path = daemon_state["seven_zip"] if daemon_state else locate_7zip()
+        if not seven_zip_path and managed_toolchains():
+            print_status("7-Zip não encontrado no sistema", "error")
+            print_status("Por favor, instale o 7-Zip e execute o script novamente", "info")
+            print_status("Download disponível em: https://www.7-zip.org/download.html", "info")
             return False
         
-        # Copiar arquivos compilados para pasta de saída
-        if not copy_to_output_dir():
+        if seven_zip_path:
+            logging.info(f"7-Zip encontrado: {seven_zip_path}")
+        
+        if args.config and not apply_build_config(args.config):
             return False
+        for name, source in args.mirrors:
+            RESOURCES[name]["mirrors"].append(source)
         
-        # Limpeza
-        cleanup_symlinks()
-        cleanup_temp()
+        timestamp_mode = args.timestamp_mode
+        if timestamp_mode == "clock" and not PLATFORM.supports_clock_mode:
+            print_status(f"O modo de data 'clock' não é suportado em {PLATFORM.name}; usando 'deterministic'", "warning")
+            timestamp_mode = "deterministic"
+        
+        ohook_extract_dir = TEMP_DIR / "ohook-extract"
+        ctx = {
+            "seven_zip_path": seven_zip_path,
+            "downloads": resource_paths(required_resources()),
+            "ohook_extract_dir": ohook_extract_dir,
+            "ohook_extracted": ohook_extract_dir / RESOURCES["ohook"]["root"],
+            "timestamp_mode": timestamp_mode,
+            "parallel_build": args.parallel_build,
+            "build_jobs": args.jobs,
+            "artifact_cache": args.artifact_cache,
+            "staging_mode": args.staging_mode,
+            "verified_toolchains": set(daemon_state["toolchains"]) if daemon_state else set(),
+            # Com --only-stage download a extração não deve acontecer
+            "overlap_extraction": args.overlap_extraction and not args.only_stage
+        }
+        
+        try:
+            pipeline_success = run_pipeline(build_stages(), ctx, args.from_stage, args.only_stage, args.force)
+        finally:
+            print_timing_summary()
+            write_trace(args.trace)
+        
+        if not pipeline_success:
+            return False
         
         print("\n" + "-"*60)
         print_status("Processo concluído com sucesso!", "success")
@@ -563,13 +2987,491 @@ def main():
         cleanup_symlinks()  # Tentar limpar links simbólicos mesmo em caso de erro
         return False
 
+class BuildDaemon:
+    def __init__(self, concurrency=DAEMON_CONCURRENCY, slot_prefix="slot", seven_zip_path=None, verified_toolchains=None):
+        self.concurrency = max(1, concurrency)
+        self.slot_prefix = slot_prefix
+        # Estado conferido uma vez e repassado a cada job (--daemon-state)
+        self.seven_zip_path = seven_zip_path
+        self.verified_toolchains = set(verified_toolchains or ())
+        self.jobs = {}
+        self.pending = queue.Queue()
+        self.condition = threading.Condition()
+    
+    def start(self):
+        for slot in range(self.concurrency):
+            thread = threading.Thread(target=self.worker, args=(f"{self.slot_prefix}-{slot}",), name=f"job-{slot}", daemon=True)
+            thread.start()
+    
+    def submit(self, build_args):
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "status": "queued",
+            "args": build_args,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "workspace": None,
+            "returncode": None,
+            "result": None,
+            "events": deque(maxlen=DAEMON_OUTPUT_LINES),
+            "next_event": 0
+        }
+        with self.condition:
+            self.jobs[job["id"]] = job
+            self.prune_jobs()
+        self.add_event(job, "status", status="queued")
+        self.pending.put(job["id"])
+        logging.info(f"Job {job['id']} enfileirado: {' '.join(build_args)}")
+        return job
+    
+    def prune_jobs(self):
+        finished = [job for job in self.jobs.values() if job["finished"]]
+        for job in sorted(finished, key=lambda job: job["finished"])[:max(0, len(self.jobs) - DAEMON_MAX_JOBS)]:
+            del self.jobs[job["id"]]
+    
+    def cancel(self, job_id):
+        # Só jobs ainda na fila: interromper um build pode deixar o relógio alterado
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] != "queued":
+                return False
+            job.update(status="cancelled", finished=time.time())
+        self.add_event(job, "status", status="cancelled")
+        return True
+    
+    def add_event(self, job, kind, **data):
+        with self.condition:
+            data.update(seq=job["next_event"], type=kind, time=time.time())
+            job["next_event"] += 1
+            job["events"].append(data)
+            self.condition.notify_all()
+    
+    def events_since(self, job, since, timeout):
+        # Bloqueia até haver eventos novos ou o job terminar
+        with self.condition:
+            self.condition.wait_for(lambda: job["next_event"] > since or job["finished"], timeout)
+            return [event for event in job["events"] if event["seq"] >= since], job["finished"] is not None
+    
+    def describe(self, job):
+        with self.condition:
+            return {key: value for key, value in job.items() if key not in ("events", "next_event")}
+    
+    def worker(self, slot):
+        while True:
+            job_id = self.pending.get()
+            with self.condition:
+                job = self.jobs.get(job_id)
+                if not job or job["status"] != "queued":
+                    continue
+                job.update(status="running", started=time.time(), workspace=slot)
+            self.add_event(job, "status", status="running", workspace=slot)
+            
+            try:
+                returncode, result = self.run_job(job, slot)
+            except Exception as e:
+                logging.exception(f"Falha ao executar o job {job_id}")
+                self.add_event(job, "output", line=f"Erro ao iniciar o build: {e}")
+                returncode, result = -1, None
+            
+            status = "succeeded" if returncode == 0 else "failed"
+            with self.condition:
+                job.update(status=status, finished=time.time(), returncode=returncode, result=result)
+            self.add_event(job, "status", status=status, returncode=returncode, result=result)
+            logging.info(f"Job {job_id} terminou: {status}")
+    
+    def run_job(self, job, slot):
+        # Cada job roda em um processo próprio, no workspace fixo do worker
+        job_dir = JOBS_DIR / job["id"]
+        job_dir.mkdir(parents=True, exist_ok=True)
+        verification_file = workspace_dir(slot) / "Logs" / VERIFICATION_FILE
+        toolchains_file = workspace_dir(slot) / "Logs" / VERIFIED_TOOLCHAINS_FILE
+        for stale_file in (verification_file, toolchains_file):
+            stale_file.unlink(missing_ok=True)
+        with self.condition:
+            state = {"seven_zip": self.seven_zip_path, "toolchains": sorted(self.verified_toolchains)}
+        (job_dir / DAEMON_STATE_FILE).write_text(json.dumps(state, indent=2), encoding="utf-8")
+        command = [
+            sys.executable, str(Path(__file__).resolve()),
+            "--workspace", slot, "--no-pause", "--trace", str(job_dir / "trace.json"),
+            "--daemon-state", str(job_dir / DAEMON_STATE_FILE)
+        ] + job["args"]
+        env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONUNBUFFERED="1")
+        
+        # A saída completa fica em Jobs/<id>/output.log; os eventos guardam só o final
+        with open(job_dir / "output.log", "w", encoding="utf-8") as output, \
+             subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              encoding="utf-8", errors="replace", env=env) as process:
+            for line in process.stdout:
+                output.write(line)
+                self.add_event(job, "output", line=line.rstrip("\n"))
+            returncode = process.wait()
+        
+        result = {"trace": str(job_dir / "trace.json"), "log": str(workspace_dir(slot) / "ohook_compiler.log"),
+                  "output": str(job_dir / "output.log"), "files": {}}
+        if verification_file.exists():
+            result["verification"] = json.loads(verification_file.read_text(encoding="utf-8"))
+        if toolchains_file.exists():
+            with self.condition:
+                self.verified_toolchains.update(json.loads(toolchains_file.read_text(encoding="utf-8")))
+        if returncode == 0:
+            # As DLLs saem do workspace (reutilizado pelo próximo job) para Jobs/<id>
+            for dll_file in result.get("verification") or EXPECTED_CHECKSUMS:
+                source = workspace_dir(slot) / "Output" / dll_file
+                if source.exists():
+                    publish_file(source, job_dir / dll_file)
+                    result["files"][dll_file] = {"path": str(job_dir / dll_file), "sha256": calculate_sha256(job_dir / dll_file)}
+        return returncode, result
+
+class DaemonRequestHandler(http.server.BaseHTTPRequestHandler):
+    # GET /status, GET /jobs, POST /jobs {"args": [...]}, GET /jobs/<id>,
+    # GET /jobs/<id>/events?since=N (NDJSON contínuo), DELETE /jobs/<id>
+    def log_message(self, format, *args):
+        logging.debug(f"API: {format % args}")
+    
+    def send_json(self, status, payload):
+        body = json.dumps(payload, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def route(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        return parts, urllib.parse.parse_qs(url.query)
+    
+    def find_job(self, job_id):
+        job = self.server.build_daemon.jobs.get(job_id)
+        if not job:
+            self.send_json(404, {"error": f"job {job_id} não encontrado"})
+        return job
+    
+    def do_GET(self):
+        build_daemon = self.server.build_daemon
+        parts, query = self.route()
+        
+        if parts == ["status"]:
+            jobs = [build_daemon.describe(job) for job in list(build_daemon.jobs.values())]
+            counts = {}
+            for job in jobs:
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            self.send_json(200, {"platform": PLATFORM.name, "concurrency": build_daemon.concurrency, "jobs": counts})
+        elif parts == ["jobs"]:
+            self.send_json(200, [build_daemon.describe(job) for job in list(build_daemon.jobs.values())])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job:
+                self.send_json(200, build_daemon.describe(job))
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            job = self.find_job(parts[1])
+            if not job:
+                return
+            try:
+                since = int(query.get("since", ["0"])[0])
+            except ValueError:
+                self.send_json(400, {"error": "since deve ser um número inteiro"})
+                return
+            self.stream_events(job, since)
+        else:
+            self.send_json(404, {"error": "rota desconhecida"})
+    
+    def stream_events(self, job, since):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        finished = False
+        while not finished:
+            events, finished = self.server.build_daemon.events_since(job, since, timeout=15)
+            for event in events:
+                self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+                since = event["seq"] + 1
+            self.wfile.flush()
+    
+    def do_POST(self):
+        parts, _ = self.route()
+        if parts != ["jobs"]:
+            self.send_json(404, {"error": "rota desconhecida"})
+            return
+        
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            build_args = [str(arg) for arg in request.get("args", [])]
+        except (ValueError, AttributeError, TypeError) as e:
+            self.send_json(400, {"error": f"corpo inválido: {e}"})
+            return
+        
+        error = build_arguments_error(build_args)
+        if error:
+            self.send_json(400, {"error": error, "args": build_args})
+            return
+        
+        job = self.server.build_daemon.submit(build_args)
+        self.send_json(202, self.server.build_daemon.describe(job))
+    
+    def do_DELETE(self):
+        parts, _ = self.route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self.send_json(404, {"error": "rota desconhecida"})
+            return
+        job = self.find_job(parts[1])
+        if not job:
+            return
+        if self.server.build_daemon.cancel(job["id"]):
+            self.send_json(200, self.server.build_daemon.describe(job))
+        else:
+            self.send_json(409, {"error": "somente jobs na fila podem ser cancelados"})
+
+def build_arguments_error(build_args):
+    # Valida os argumentos de um job antes de enfileirá-lo (daemon e modo lote)
+    reserved = [arg for arg in build_args if arg.split("=")[0] in DAEMON_RESERVED_OPTIONS]
+    if reserved:
+        return f"opções reservadas ao daemon: {', '.join(reserved)}"
+    errors = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(errors):
+            parse_arguments(build_args)
+    except SystemExit:
+        return errors.getvalue().strip().splitlines()[-1]
+    return None
+
+def run_bundle_command(args):
+    setup_logging()
+    initialize_directories()
+    if args.export_bundle:
+        return export_bundle(args.export_bundle)
+    return import_bundle(args.import_bundle)
+
+def run_daemon(args):
+    global log_file
+    log_file = MAIN_DIR / "ohook_daemon.log"
+    setup_logging()
+    initialize_directories()
+    
+    # As verificações de ambiente são feitas uma vez, na inicialização
+    if not check_admin():
+        print_status("Este script precisa ser executado como administrador", "error")
+        return False
+    seven_zip_path = locate_7zip()
+    if not seven_zip_path and managed_toolchains():
+        print_status("7-Zip não encontrado no sistema", "error")
+        return False
+    verified = verify_installed_toolchains()
+    if verified:
+        print_status(f"{len(verified)} toolchain(s) conferido(s); os jobs não repetem a verificação", "info")
+    
+    build_daemon = BuildDaemon(args.concurrency or DAEMON_CONCURRENCY, seven_zip_path=seven_zip_path, verified_toolchains=verified)
+    build_daemon.start()
+    server = http.server.ThreadingHTTPServer((args.host, args.port), DaemonRequestHandler)
+    server.build_daemon = build_daemon
+    print_status(f"Daemon ouvindo em http://{args.host}:{server.server_port} ({build_daemon.concurrency} job(s) simultâneo(s))", "info")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print_status("Daemon encerrado", "info")
+    finally:
+        server.server_close()
+    return True
+
+def load_batch_manifest(manifest_path):
+    # {"concurrency": N, "args": [...], "entries": [{"name", "resources", "checksums", "args"}]}
+    manifest = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+    if not isinstance(manifest, dict) or not manifest.get("entries"):
+        raise ValueError("o manifesto não tem entradas (\"entries\")")
+    
+    common_args = [str(arg) for arg in manifest.get("args", [])]
+    entries = [normalize_batch_entry(entry, index) for index, entry in enumerate(manifest["entries"], 1)]
+    names = [entry["name"] for entry in entries]
+    duplicated = sorted({name for name in names if names.count(name) > 1})
+    if duplicated:
+        raise ValueError(f"nomes de entrada repetidos: {', '.join(duplicated)}")
+    
+    for entry in entries:
+        entry["args"] = common_args + entry["args"]
+        error = build_arguments_error(entry["args"])
+        if error:
+            raise ValueError(f"{entry['name']}: {error}")
+    return entries, manifest.get("concurrency")
+
+def batch_toolchain_versions(entries):
+    # Maior número de versões distintas de um mesmo toolchain no lote
+    versions = {name: {entry["resources"][name]["url"] for entry in entries} for name in managed_toolchains()}
+    return max((len(urls) for urls in versions.values()), default=0)
+
+def prefetch_batch_resources(entries):
+    # Cada pacote distinto é baixado uma vez para o cache compartilhado, de onde
+    # os builds o obtêm; pacotes com o mesmo nome de arquivo vão em rodadas separadas
+    unique = {}
+    for entry in entries:
+        for name, resource in entry["resources"].items():
+            if name in TOOLCHAINS and name not in managed_toolchains():
+                continue
+            unique.setdefault((resource["url"], resource["sha256"]), (f"{name}-{len(unique) + 1}", resource))
+    
+    rounds = []
+    for label, resource in unique.values():
+        filename = os.path.basename(resource["url"])
+        for resources in rounds:
+            if filename not in {os.path.basename(other["url"]) for other in resources.values()}:
+                resources[label] = resource
+                break
+        else:
+            rounds.append({label: resource})
+    
+    download_dir = TEMP_DIR / "batch-downloads"
+    try:
+        return all(fetch_all_resources(resources, download_dir) is not None for resources in rounds)
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
+
+def batch_entry_report(entry, job):
+    result = job["result"] or {}
+    verification = result.get("verification") or {}
+    if job["status"] == "succeeded":
+        status = "verified"
+    elif verification and all(check["actual"] for check in verification.values()):
+        # Compilou, mas o resultado difere dos checksums esperados
+        status = "mismatch"
+    else:
+        status = "failed"
+    
+    return {
+        "name": entry["name"],
+        "status": status,
+        "job": job["id"],
+        "returncode": job["returncode"],
+        "duration": round(job["finished"] - job["started"], 3) if job["started"] and job["finished"] else None,
+        "args": entry["args"],
+        "resources": {
+            name: {"url": resource["url"], "sha256": resource_digest(resource)}
+            for name, resource in entry["resources"].items()
+            if name not in TOOLCHAINS or name in managed_toolchains()
+        },
+        "host_toolchain": PLATFORM.toolchain_identity() if PLATFORM.uses_host_toolchain else None,
+        "files": {
+            dll_file: dict(check, path=result.get("files", {}).get(dll_file, {}).get("path"))
+            for dll_file, check in verification.items()
+        },
+        "output": result.get("output"),
+        "trace": result.get("trace")
+    }
+
+def write_batch_report(report_path, report):
+    temp_file = report_path.with_name(report_path.name + ".tmp")
+    temp_file.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    os.replace(temp_file, report_path)
+
+def run_batch(args):
+    global log_file
+    log_file = MAIN_DIR / "ohook_batch.log"
+    setup_logging()
+    initialize_directories()
+    
+    try:
+        entries, manifest_concurrency = load_batch_manifest(args.batch)
+    except (OSError, ValueError) as e:
+        print_status(f"Manifesto inválido ({args.batch}): {e}", "error")
+        return False
+    
+    if not check_admin():
+        print_status("Este script precisa ser executado como administrador", "error")
+        return False
+    seven_zip_path = locate_7zip()
+    if not seven_zip_path and managed_toolchains():
+        print_status("7-Zip não encontrado no sistema", "error")
+        return False
+    
+    run_dir = BATCH_DIR / datetime.now().strftime("%Y%m%d-%H%M%S")
+    run_dir.mkdir(parents=True, exist_ok=True)
+    report_path = run_dir / BATCH_REPORT_FILE
+    report = {
+        "manifest": str(Path(args.batch).resolve()),
+        "platform": PLATFORM.name,
+        "started": time.time(),
+        "finished": None,
+        "summary": {},
+        "entries": []
+    }
+    print_status(f"Lote com {len(entries)} entrada(s); relatório em {report_path}", "info")
+    
+    with timed("download do lote", "download"):
+        fetched = prefetch_batch_resources(entries)
+    if not fetched:
+        print_status("Falha ao obter os recursos do lote; nenhum build foi iniciado", "error")
+        report.update(finished=time.time(), summary={"failed": len(entries)},
+                      entries=[{"name": entry["name"], "status": "failed", "error": "download"} for entry in entries])
+        write_batch_report(report_path, report)
+        return False
+    
+    build_daemon = BuildDaemon(args.concurrency or manifest_concurrency or DAEMON_CONCURRENCY, slot_prefix="batch",
+                               seven_zip_path=seven_zip_path, verified_toolchains=verify_installed_toolchains())
+    build_daemon.start()
+    keep = batch_toolchain_versions(entries)
+    jobs = {}
+    for entry in entries:
+        config_path = run_dir / f"{entry['name']}.json"
+        config_path.write_text(json.dumps(dict(entry, toolchain_store_keep=keep), indent=2), encoding="utf-8")
+        jobs[entry["name"]] = build_daemon.submit(["--config", str(config_path)] + entry["args"])
+    
+    # Só as mudanças de situação vão para o console; a saída de cada build fica em Jobs/<id>/output.log
+    reported = {}
+    with build_daemon.condition:
+        while True:
+            for name, job in jobs.items():
+                if reported.get(name) == job["status"]:
+                    continue
+                reported[name] = job["status"]
+                if job["status"] == "running":
+                    print_status(f"{name}: compilando em {job['workspace']}", "info")
+                elif job["status"] == "succeeded":
+                    print_status(f"{name}: concluído e verificado", "success")
+                elif job["status"] == "failed":
+                    print_status(f"{name}: falhou (saída em {(job['result'] or {}).get('output')})", "error")
+            if all(job["finished"] for job in jobs.values()):
+                break
+            build_daemon.condition.wait(timeout=1)
+    
+    report["entries"] = [batch_entry_report(entry, jobs[entry["name"]]) for entry in entries]
+    for entry_report in report["entries"]:
+        report["summary"][entry_report["status"]] = report["summary"].get(entry_report["status"], 0) + 1
+    report["finished"] = time.time()
+    write_batch_report(report_path, report)
+    
+    print("\n" + "-"*60)
+    for entry_report in report["entries"]:
+        duration = f"{entry_report['duration']:.1f}s" if entry_report["duration"] is not None else "-"
+        print(f"{entry_report['name']:<32} {entry_report['status']:<10} {duration:>9}")
+        if entry_report["status"] == "mismatch":
+            for dll_file, check in entry_report["files"].items():
+                if not check["match"]:
+                    print(f"    {dll_file}: esperado {check['expected']}, obtido {check['actual']}")
+    print("-"*60)
+    print_status(f"Relatório consolidado: {report_path}", "info")
+    return report["summary"].get("verified", 0) == len(entries)
+
 if __name__ == "__main__":
+    args = parse_arguments()
+    # O daemon e os jobs que ele inicia nunca esperam por Enter
+    pause = args.pause and not args.daemon
+    success = False
     try:
-        success = main()
+        if args.daemon:
+            success = run_daemon(args)
+        elif args.batch:
+            success = run_batch(args)
+        elif args.export_bundle or args.import_bundle:
+            success = run_bundle_command(args)
+        else:
+            success = main(args)
         if not success:
             print("\nO script encontrou erros e não pôde ser concluído corretamente.")
         
-        input("\nPressione Enter para sair...")
+        if pause:
+            input("\nPressione Enter para sair...")
     except KeyboardInterrupt:
         print("\n\nOperação cancelada pelo usuário")
         keep_date_fixed = False
@@ -581,4 +3483,6 @@ if __name__ == "__main__":
         keep_date_fixed = False
         restore_time()
         cleanup_symlinks()
-        input("\nPressione Enter para sair...")
+        if pause:
+            input("\nPressione Enter para sair...")
+    sys.exit(0 if success else 1)
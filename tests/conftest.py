@@ -0,0 +1,28 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_script(name, file_name):
+    spec = importlib.util.spec_from_file_location(name, ROOT_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def builder(tmp_path, monkeypatch):
+    # Os diretórios de trabalho são definidos na importação a partir de OHOOK_BUILDER_HOME
+    monkeypatch.setenv("OHOOK_BUILDER_HOME", str(tmp_path / "home"))
+    module = load_script("ohook_builder", "ohook-builder.py")
+    monkeypatch.setattr(module, "RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(module, "RETRY_MAX_DELAY", 0.0)
+    return module
+
+
+@pytest.fixture
+def benchmark():
+    return load_script("ohook_benchmark", "ohook-benchmark.py")
@@ -0,0 +1,98 @@
+import contextlib
+import hashlib
+import os
+import socket
+
+import pytest
+
+
+@pytest.fixture
+def archives(tmp_path):
+    official = tmp_path / "official"
+    tampered = tmp_path / "tampered"
+    official.mkdir()
+    tampered.mkdir()
+    content = os.urandom(128 * 1024)
+    (official / "ohook.zip").write_bytes(content)
+    (tampered / "ohook.zip").write_bytes(os.urandom(len(content)))
+    return official, tampered, hashlib.sha256(content).hexdigest()
+
+
+@pytest.fixture
+def dead_url():
+    # Porta livre sem servidor: a conexão é recusada na hora
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/ohook.zip"
+
+
+def test_rank_sources_orders_by_speed(builder, benchmark, archives, dead_url):
+    official, _, _ = archives
+    with contextlib.ExitStack() as stack:
+        slow = stack.enter_context(benchmark.local_server(official, delay=0.3)) + "/ohook.zip"
+        fast = stack.enter_context(benchmark.local_server(official)) + "/ohook.zip"
+
+        assert builder.rank_sources([dead_url, slow, fast]) == [fast, slow, dead_url]
+
+
+def test_fails_over_to_mirror(builder, benchmark, tmp_path, archives, dead_url):
+    official, _, expected_hash = archives
+    destination = tmp_path / "Temp" / "ohook.zip"
+    with benchmark.local_server(official) as mirror:
+        resource = {"url": dead_url, "mirrors": [mirror + "/ohook.zip"]}
+
+        actual_hash, source = builder.download_from_sources(resource, destination, expected_hash)
+
+    assert (actual_hash, source) == (expected_hash, mirror + "/ohook.zip")
+    assert destination.read_bytes() == (official / "ohook.zip").read_bytes()
+
+
+def test_rejects_mirror_with_wrong_digest(builder, benchmark, tmp_path, archives):
+    official, tampered, expected_hash = archives
+    destination = tmp_path / "ohook.zip"
+    with contextlib.ExitStack() as stack:
+        # A origem oficial é mais lenta, então o mirror adulterado é tentado primeiro
+        url = stack.enter_context(benchmark.local_server(official, delay=0.3)) + "/ohook.zip"
+        mirror = stack.enter_context(benchmark.local_server(tampered)) + "/ohook.zip"
+        resource = {"url": url, "mirrors": [mirror]}
+
+        actual_hash, source = builder.download_from_sources(resource, destination, expected_hash)
+
+    assert (actual_hash, source) == (expected_hash, url)
+    assert destination.read_bytes() == (official / "ohook.zip").read_bytes()
+
+
+def test_all_sources_wrong_digest(builder, benchmark, tmp_path, archives):
+    _, tampered, expected_hash = archives
+    destination = tmp_path / "ohook.zip"
+    with benchmark.local_server(tampered) as base_url:
+        resource = {"url": base_url + "/ohook.zip", "mirrors": [(tampered / "ohook.zip").as_uri()]}
+
+        assert builder.download_from_sources(resource, destination, expected_hash) == (None, None)
+    assert not destination.exists()
+
+
+def test_without_digest_prefers_official_url(builder, benchmark, tmp_path, archives):
+    official, tampered, _ = archives
+    destination = tmp_path / "ohook.zip"
+    with contextlib.ExitStack() as stack:
+        url = stack.enter_context(benchmark.local_server(official, delay=0.3)) + "/ohook.zip"
+        mirror = stack.enter_context(benchmark.local_server(tampered)) + "/ohook.zip"
+        resource = {"url": url, "mirrors": [mirror]}
+
+        actual_hash, source = builder.download_from_sources(resource, destination)
+
+    assert source == url
+    assert actual_hash == hashlib.sha256((official / "ohook.zip").read_bytes()).hexdigest()
+
+
+def test_local_mirror(builder, tmp_path, archives, dead_url):
+    official, _, expected_hash = archives
+    destination = tmp_path / "Temp" / "ohook.zip"
+    resource = {"url": dead_url, "mirrors": [(official / "ohook.zip").as_uri()]}
+
+    actual_hash, source = builder.download_from_sources(resource, destination, expected_hash)
+
+    assert (actual_hash, source) == (expected_hash, (official / "ohook.zip").as_uri())
+    assert destination.read_bytes() == (official / "ohook.zip").read_bytes()
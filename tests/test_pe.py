@@ -0,0 +1,135 @@
+import struct
+from datetime import datetime, timezone
+
+import pytest
+
+PE_OFFSET = 0x40
+COFF_OFFSET = PE_OFFSET + 4
+OPTIONAL_OFFSET = COFF_OFFSET + 20
+SECTION_RVA = 0x1000
+SECTION_RAW = 0x200
+EXPORT_RAW = SECTION_RAW
+RESOURCE_RAW = SECTION_RAW + 0x40
+DEBUG_RAW = SECTION_RAW + 0x80
+LINKER_STAMP = 0x64D0A1B2
+
+
+def build_pe(pe32_plus, checksum=0x1234):
+    # DLL mínima com uma seção contendo os diretórios de exportação, recursos e
+    # depuração (duas entradas, a segunda com carimbo zerado pelo linker)
+    data = bytearray(SECTION_RAW * 2)
+    data[:2] = b"MZ"
+    struct.pack_into("<I", data, 0x3C, PE_OFFSET)
+    data[PE_OFFSET:PE_OFFSET + 4] = b"PE\0\0"
+
+    optional_size = 240 if pe32_plus else 224
+    machine = 0x8664 if pe32_plus else 0x14C
+    struct.pack_into("<HHIIIHH", data, COFF_OFFSET, machine, 1, LINKER_STAMP, 0, 0, optional_size, 0x2102)
+
+    struct.pack_into("<H", data, OPTIONAL_OFFSET, 0x20B if pe32_plus else 0x10B)
+    struct.pack_into("<I", data, OPTIONAL_OFFSET + 64, checksum)
+    directories_offset = OPTIONAL_OFFSET + (112 if pe32_plus else 96)
+    struct.pack_into("<I", data, directories_offset - 4, 16)
+    struct.pack_into("<II", data, directories_offset + 0 * 8, SECTION_RVA, 40)
+    struct.pack_into("<II", data, directories_offset + 2 * 8, SECTION_RVA + 0x40, 16)
+    struct.pack_into("<II", data, directories_offset + 6 * 8, SECTION_RVA + 0x80, 2 * 28)
+
+    section_offset = OPTIONAL_OFFSET + optional_size
+    struct.pack_into("<8sIIII", data, section_offset, b".rdata", SECTION_RAW, SECTION_RVA, SECTION_RAW, SECTION_RAW)
+
+    struct.pack_into("<I", data, EXPORT_RAW + 4, LINKER_STAMP)
+    struct.pack_into("<I", data, RESOURCE_RAW + 4, LINKER_STAMP + 1)
+    struct.pack_into("<I", data, DEBUG_RAW + 4, LINKER_STAMP + 2)
+    struct.pack_into("<I", data, DEBUG_RAW + 28 + 4, 0)
+    return data
+
+
+def reference_checksum(data, checksum_offset):
+    # Implementação palavra a palavra, com a dobra do carry a cada soma
+    total = 0
+    for offset in range(0, len(data), 2):
+        if offset in (checksum_offset, checksum_offset + 2):
+            continue
+        total += struct.unpack_from("<H", data + b"\0", offset)[0]
+        total = (total & 0xFFFF) + (total >> 16)
+    return total + len(data)
+
+
+@pytest.fixture(params=[False, True], ids=["pe32", "pe32+"])
+def pe_file(request, tmp_path):
+    path = tmp_path / "sppc.dll"
+    path.write_bytes(build_pe(request.param))
+    return path
+
+
+def read_stamp(data, offset):
+    return struct.unpack_from("<I", data, offset)[0]
+
+
+def test_normalizes_all_timestamps(builder, pe_file):
+    expected = int(builder.BUILD_TIMESTAMP.timestamp())
+
+    changes = builder.normalize_pe_timestamps(pe_file)
+
+    data = pe_file.read_bytes()
+    assert changes == {
+        COFF_OFFSET + 4: LINKER_STAMP,
+        EXPORT_RAW + 4: LINKER_STAMP,
+        RESOURCE_RAW + 4: LINKER_STAMP + 1,
+        DEBUG_RAW + 4: LINKER_STAMP + 2,
+    }
+    for offset in changes:
+        assert read_stamp(data, offset) == expected
+    assert read_stamp(data, DEBUG_RAW + 28 + 4) == 0
+
+
+def test_recomputes_checksum(builder, pe_file):
+    builder.normalize_pe_timestamps(pe_file)
+
+    data = pe_file.read_bytes()
+    checksum_offset = OPTIONAL_OFFSET + 64
+    assert read_stamp(data, checksum_offset) == reference_checksum(data, checksum_offset)
+    assert builder.pe_checksum(data, checksum_offset) == reference_checksum(data, checksum_offset)
+
+
+def test_odd_length_checksum(builder):
+    data = bytes(build_pe(False)) + b"\x7f"
+    checksum_offset = OPTIONAL_OFFSET + 64
+    assert builder.pe_checksum(data, checksum_offset) == reference_checksum(data, checksum_offset)
+
+
+def test_is_idempotent(builder, pe_file):
+    builder.normalize_pe_timestamps(pe_file)
+    first = pe_file.read_bytes()
+    mtime = pe_file.stat().st_mtime_ns
+
+    assert builder.normalize_pe_timestamps(pe_file) == {}
+    assert pe_file.read_bytes() == first
+    assert pe_file.stat().st_mtime_ns == mtime
+
+
+def test_zero_checksum_is_kept(builder, tmp_path):
+    path = tmp_path / "sppc.dll"
+    path.write_bytes(build_pe(True, checksum=0))
+
+    builder.normalize_pe_timestamps(path)
+
+    assert read_stamp(path.read_bytes(), OPTIONAL_OFFSET + 64) == 0
+
+
+def test_custom_timestamp(builder, pe_file):
+    timestamp = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+    builder.normalize_pe_timestamps(pe_file, timestamp)
+
+    assert read_stamp(pe_file.read_bytes(), COFF_OFFSET + 4) == int(timestamp.timestamp())
+
+
+@pytest.mark.parametrize("content", [b"ELF" + bytes(0x100), b"MZ" + bytes(0x3A) + struct.pack("<I", 0x40) + b"NE\0\0"])
+def test_rejects_non_pe(builder, tmp_path, content):
+    path = tmp_path / "sppc.dll"
+    path.write_bytes(content)
+
+    with pytest.raises(ValueError):
+        builder.normalize_pe_timestamps(path)
+    assert path.read_bytes() == content